@@ -0,0 +1,3 @@
+"""
+benchmarks for plotme, run with python -m benchmarks from the repository root
+"""
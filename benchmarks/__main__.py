@@ -0,0 +1,143 @@
+"""
+runs the benchmark suite on synthetic trees and optionally saves or compares against a baseline
+
+run from the repository root:
+    python -m benchmarks                 # run and print the timings
+    python -m benchmarks --save          # store the timings as the baseline
+    python -m benchmarks --compare       # compare against the baseline, exits with 1 on a regression
+"""
+import argparse
+import json
+import logging
+import platform
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+from plotme import __version__
+from benchmarks.suite import Tree, benchmarks, default_trees
+from benchmarks.generate import file_types, tree_modes
+
+default_baseline = Path(__file__).parent / "baseline.json"
+
+
+def time_it(function, repeat):
+    """
+    best time of repeat runs in seconds, fast functions are run in loops of at least 0.2 s
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run_suite(trees, names, repeat=3, data_dir=None):
+    """
+    Parameters
+    ----------
+    trees: list
+        make_tree() key word arguments of each tree
+    names: list
+        benchmarks to run
+    repeat: int
+        runs of each benchmark, the best is kept
+    data_dir: str or Path
+        directory to generate the trees in, a temporary directory if None
+
+    Returns
+    -------
+    dict
+        {tree name/benchmark name: seconds}
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for tree_kwargs in trees:
+            tree_name = f"{tree_kwargs['file_type']}-{tree_kwargs['mode']}"
+            tree = Tree(Path(data_dir or tmp_dir, tree_name), **tree_kwargs)
+            for name in names:
+                seconds = time_it(benchmarks[name](tree), repeat)
+                results[f"{tree.name}/{name}"] = seconds
+                print(f"{tree.name + '/' + name:<30} {seconds * 1000:10.2f} ms", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    print the ratio of each result to the baseline
+
+    Returns
+    -------
+    list
+        benchmarks more than threshold slower than the baseline
+    """
+    regressions = []
+    print(f"\n{'benchmark':<30} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, seconds in results.items():
+        if name not in baseline:
+            print(f"{name:<30} {'-':>12} {seconds * 1000:9.2f} ms {'new':>7}")
+            continue
+        ratio = seconds / baseline[name]
+        if ratio > 1 + threshold:
+            flag = "  slower"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        else:
+            flag = ""
+        print(f"{name:<30} {baseline[name] * 1000:9.2f} ms {seconds * 1000:9.2f} ms {ratio:7.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="benchmark plotme on synthetic trees")
+    parser.add_argument('-b', '--bench', nargs='+', choices=list(benchmarks), default=list(benchmarks),
+                        help="benchmarks to run, default all")
+    parser.add_argument('--file-type', nargs='+', choices=file_types,
+                        help="only run the default trees of these file types")
+    parser.add_argument('--mode', nargs='+', choices=tree_modes, help="only run the default trees of these modes")
+    parser.add_argument('--folders', type=int, help="folders per tree, overrides the defaults")
+    parser.add_argument('--files', type=int, help="data files per folder, overrides the defaults")
+    parser.add_argument('--rows', type=int, help="rows per data file, overrides the defaults")
+    parser.add_argument('--columns', type=int, help="columns per data file, overrides the defaults")
+    parser.add_argument('--repeat', type=int, default=3, help="runs of each benchmark, the best is kept")
+    parser.add_argument('--data-dir', help="generate the trees here and keep them, default a temporary directory")
+    parser.add_argument('--baseline', default=default_baseline, help="baseline file for --save and --compare")
+    parser.add_argument('--save', action='store_true', help="store the timings as the baseline")
+    parser.add_argument('--compare', action='store_true', help="compare the timings to the baseline")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="fraction slower than the baseline that counts as a regression, default 0.2")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)  # plotme logs every plot at info level
+    overrides = {key: value for key, value in [('n_folders', args.folders), ('n_files', args.files),
+                                               ('n_rows', args.rows), ('n_columns', args.columns)]
+                 if value is not None}
+    trees = [dict(tree, **overrides) for tree in default_trees
+             if (args.file_type is None or tree['file_type'] in args.file_type)
+             and (args.mode is None or tree['mode'] in args.mode)]
+    if not trees:
+        parser.error("no default tree matches --file-type and --mode")
+
+    results = run_suite(trees, args.bench, args.repeat, args.data_dir)
+
+    baseline_path = Path(args.baseline)
+    ret = 0
+    if args.compare:
+        with open(baseline_path) as json_file:
+            baseline = json.load(json_file)
+        print(f"baseline from plotme {baseline['plotme_version']}, python {baseline['python']} on "
+              f"{baseline['platform']}")
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmarks are more than {args.threshold:.0%} slower than the baseline")
+            ret = 1
+    if args.save:
+        with open(baseline_path, "w") as json_file:
+            json.dump({'plotme_version': __version__, 'python': platform.python_version(),
+                       'platform': platform.platform(), 'trees': trees, 'results': results}, json_file, indent=4)
+        print(f"baseline saved to {baseline_path}")
+    return ret
+
+
+if __name__ == "__main__":
+    sys.exit(main())
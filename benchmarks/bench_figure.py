@@ -0,0 +1,43 @@
+"""
+bench_figure.py compares building a 1,000 trace figure the way single_plot does with the previous
+make_subplots + add_trace approach
+
+run from the repository root: python -m benchmarks.bench_figure
+"""
+import timeit
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from plotme.plotting import build_figure
+
+n_traces = 1000
+n_points = 100
+
+
+def legacy_figure(x, ys):
+    fig = make_subplots(rows=1, cols=1, shared_yaxes=True, x_title="x", y_title="y")
+    for i, y in enumerate(ys):
+        fig.add_trace(go.Scatter(name=f"trace_{i}", mode='markers', x=x, y=y, marker_symbol=i % 55, error_y={}),
+                      row=1, col=1)
+    return fig
+
+
+def bulk_figure(x, ys):
+    traces = [{'type': 'scatter', 'name': f"trace_{i}", 'mode': 'markers', 'x': x, 'y': y,
+               'marker': {'symbol': i % 55}, 'error_y': {}} for i, y in enumerate(ys)]
+    return build_figure(traces, "x", "y")
+
+
+def main():
+    rng = np.random.default_rng(0)
+    x = np.arange(n_points)
+    ys = [rng.random(n_points) for _ in range(n_traces)]
+    for name, function in [("legacy", legacy_figure), ("bulk", bulk_figure)]:
+        seconds = min(timeit.repeat(lambda: function(x, ys), number=1, repeat=3))
+        print(f"{name:>6}: {seconds:.3f} s for {n_traces} traces")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+bench_html.py compares the size and write time of a plot's html file for each --plotlyjs mode, with float64 and
+float32 trace data and with the data written as decimal json text like plotly did before binary arrays, the suite's
+html and html_float32 benchmarks track the write time
+
+run from the repository root: python -m benchmarks.bench_html
+"""
+import os
+import tempfile
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+from plotme.plotting import _as_float32, build_figure, plotlyjs_src
+
+n_traces = 10
+n_points = 100000
+
+
+def figure(ys, x, encoding):
+    traces = []
+    for i, y in enumerate(ys):
+        trace_x, trace_y = x, y
+        if encoding == "float32":
+            trace_x, trace_y = _as_float32(x), _as_float32(y)
+        elif encoding == "text":
+            trace_x, trace_y = x.tolist(), y.tolist()
+        traces.append({'type': 'scattergl', 'name': f"trace_{i}", 'mode': 'markers', 'x': trace_x, 'y': trace_y})
+    return build_figure(traces, "x", "y")
+
+
+def main():
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 1000, n_points)
+    ys = [rng.standard_normal(n_points).cumsum() for _ in range(n_traces)]
+    with tempfile.TemporaryDirectory() as data_root:
+        plot_dir = Path(data_root, "plot")
+        plot_dir.mkdir()
+        html_path = Path(plot_dir, "plot.html")
+        print(f"{n_traces} traces of {n_points} points")
+        for mode, include_plotlyjs in [("cdn", "cdn"), ("directory", plotlyjs_src(plot_dir, data_root)),
+                                       ("inline", True)]:
+            for encoding in ["text", "float64", "float32"]:
+                fig = figure(ys, x, encoding)
+                seconds = min(timeit.repeat(
+                    lambda: fig.write_html(html_path, full_html=False, include_plotlyjs=include_plotlyjs),
+                    number=1, repeat=3))
+                size = os.path.getsize(html_path) / 1024 ** 2
+                print(f"{mode:>9} {encoding:>7}: {size:7.2f} MB written in {seconds:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
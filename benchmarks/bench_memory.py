@@ -0,0 +1,57 @@
+"""
+bench_memory.py compares the peak resident memory of plotting a large generated tree with and without low_memory and
+float32, each configuration runs in a fresh process
+
+run from the repository root: python -m benchmarks.bench_memory
+"""
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.generate import make_tree
+
+n_folders = 10
+n_files = 5
+n_rows = 200000
+n_columns = 8
+
+# plot_all in a fresh process, prints its peak RSS in bytes
+run_script = """
+import json, sys
+from plotme import profiling
+from plotme.plotting import plot_all
+plot_all(json.loads(sys.argv[1]))
+print(profiling.peak_rss())
+"""
+
+configurations = {
+    "default": {},
+    "float32": {"float32": True},
+    "low_memory": {"low_memory": True},
+    "low_memory float32": {"low_memory": True, "float32": True},
+}
+
+
+def peak_rss(data_root, settings):
+    args_dict = {"data_root": str(data_root), "force": True, "show": False, "cache": False, "html": False}
+    args_dict.update(settings)
+    output = subprocess.run([sys.executable, "-c", run_script, json.dumps(args_dict)], check=True,
+                            capture_output=True, text=True).stdout
+    return int(output.split()[-1])
+
+
+def main():
+    with tempfile.TemporaryDirectory() as data_root:
+        make_tree(data_root, n_folders, n_files, n_rows, n_columns, mode="trace")
+        print(f"{n_folders} folders of {n_files} files, {n_rows} rows and {n_columns} columns each")
+        baseline = None
+        for name, settings in configurations.items():
+            rss = peak_rss(Path(data_root), settings)
+            baseline = baseline or rss
+            print(f"{name:>18}: peak RSS {rss / 1024 ** 2:8.1f} MB ({rss / baseline:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+generate.py builds synthetic data trees for the benchmarks, a plot_info file at the root and n_folders folders of
+n_files data files each
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+tree_modes = ["trace", "point", "plot"]
+file_types = ["csv", "xlsx"]
+
+
+def plot_info_for(mode, n_columns):
+    """
+    plot_info settings that make single_plot draw the tree as mode
+
+    trace: one trace per file, x vs the first y column
+    point: one trace per folder, a point per file, x from the file name and y the average of the first y column
+    plot: one trace per y column
+    """
+    y_ids = [f"y_{i}" for i in range(n_columns - 1)]
+    plot_info = {"title_text": f"benchmark {mode}", "x_id": "x"}
+    match mode:
+        case "trace":
+            plot_info["y_id"] = y_ids[0]
+        case "point":
+            plot_info.update({"x_id": "_(\\d+)N", "y_id": y_ids[0], "post": "avg",
+                              "schema": {"x_id_is_reg_exp": True}})
+        case "plot":
+            plot_info.update({"y_id": y_ids, "y_title": "y"})
+        case _:
+            raise ValueError(f"Unexpected mode: {mode}, options are {', '.join(tree_modes)}")
+    return plot_info
+
+
+def make_tree(root, n_folders=10, n_files=5, n_rows=5000, n_columns=8, file_type="csv", mode="trace", seed=0):
+    """
+    write a synthetic data tree
+
+    Parameters
+    ----------
+    root: str or Path
+        directory to create the tree in
+    n_folders: int
+        number of data folders
+    n_files: int
+        data files per folder
+    n_rows: int
+        rows per data file
+    n_columns: int
+        columns per data file, an x column followed by y columns
+    file_type: str
+        'csv' or 'xlsx'
+    mode: str
+        'trace', 'point' or 'plot', see plot_info_for()
+    seed: int
+        seed of the random data so trees are identical between runs
+
+    Returns
+    -------
+    Path
+        the plot_info file
+    """
+    if file_type not in file_types:
+        raise ValueError(f"Unexpected file_type: {file_type}, options are {', '.join(file_types)}")
+    if n_columns < 2:
+        raise ValueError("n_columns must be at least 2, an x column and a y column")
+
+    root = Path(root)
+    rng = np.random.default_rng(seed)
+    columns = ["x"] + [f"y_{i}" for i in range(n_columns - 1)]
+    for i in range(n_folders):
+        folder = Path(root, f"folder_{i}")
+        folder.mkdir(parents=True, exist_ok=True)
+        for j in range(n_files):
+            data = rng.standard_normal((n_rows, n_columns)).cumsum(axis=0)
+            data[:, 0] = np.arange(n_rows)
+            df = pd.DataFrame(data, columns=columns)
+            # point mode reads x from the file name
+            file_path = Path(folder, f"data_{(j + 1) * 10}N.{file_type}")
+            if file_type == "csv":
+                df.to_csv(file_path, index=False)
+            else:
+                df.to_excel(file_path, index=False)
+
+    plot_info = plot_info_for(mode, n_columns)
+    plot_info_path = Path(root, "plot_info.json")
+    with open(plot_info_path, "w") as json_file:
+        json.dump(plot_info, json_file, indent=4)
+    return plot_info_path
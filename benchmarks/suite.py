@@ -0,0 +1,153 @@
+"""
+suite.py contains the benchmarks, each one times a stage of plot_all on a synthetic tree from generate.py
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+from benchmarks.generate import make_tree
+from plotme.config import PlotConfig
+from plotme.hashing import stat_dir_hash, stat_files_hash
+from plotme.index import DirIndex
+from plotme.load_data import Folder, preprocessing
+from plotme.plotting import _as_float32, build_figure, hash_ignore, plot_all
+from plotme.read import read
+from plotme.selection import plot_dependencies
+
+# tree configurations run by default, excel files are slow to write and read so that tree is smaller
+default_trees = [
+    {"file_type": "csv", "mode": "trace"},
+    {"file_type": "csv", "mode": "point"},
+    {"file_type": "csv", "mode": "plot"},
+    {"file_type": "xlsx", "mode": "trace", "n_folders": 2, "n_files": 2, "n_rows": 2000},
+]
+pre = ["remove_null", "remove_zero", "remove_strings", "convert_to_float"]
+
+
+class Tree(object):
+    """
+    a generated tree and what the benchmarks need to know about it
+
+    Parameters
+    ----------
+    root: Path
+        directory to create the tree in
+    tree_kwargs: dict
+        passed to make_tree()
+    """
+
+    def __init__(self, root, **tree_kwargs):
+        self.root = Path(root)
+        self.name = f"{tree_kwargs.get('file_type', 'csv')}-{tree_kwargs.get('mode', 'trace')}"
+        self.plot_info_path = make_tree(root, **tree_kwargs)
+        with open(self.plot_info_path) as json_file:
+            self.plot_info = json.load(json_file)
+        self.folders = sorted(path for path in self.root.iterdir() if path.is_dir())
+        self.data_file = sorted(self.folders[0].iterdir())[0]
+
+        # backdate the data so change detection doesn't treat it as possibly still being written
+        an_hour_ago = time.time() - 3600
+        for folder in self.folders:
+            for file_path in folder.iterdir():
+                os.utime(file_path, (an_hour_ago, an_hour_ago))
+
+    def args_dict(self, **kwargs):
+        """
+        the tree's plot_info with the plot_all arguments the benchmarks use, kwargs are added to it
+        """
+        args_dict = json.loads(json.dumps(self.plot_info))
+        args_dict.update({"plot_dir": self.root, "plot_info_file": self.plot_info_path, "show": False,
+                          "cache": False})
+        args_dict.update(kwargs)
+        return args_dict
+
+
+def time_discovery(tree):
+    return lambda: DirIndex(tree.root).find_files("*plot_info.json")
+
+
+def time_hash_cold(tree):
+    return lambda: stat_dir_hash(tree.root, hash_ignore)
+
+
+def time_hash_warm(tree):
+    manifest = stat_dir_hash(tree.root, hash_ignore)[1]
+    return lambda: stat_dir_hash(tree.root, hash_ignore, manifest)
+
+
+def time_hash_strict(tree):
+    # --strict-hash reads every file the plot depends on, the same as without a previous manifest
+    config = PlotConfig(tree.args_dict())
+
+    def run():
+        dir_index = DirIndex(tree.root)
+        return stat_files_hash(tree.root, plot_dependencies(config, dir_index), None, dir_index)
+    return run
+
+
+def time_read(tree):
+    return lambda: read(tree.data_file)
+
+
+def time_preprocessing(tree):
+    df = read(tree.data_file)
+    return lambda: preprocessing(df, pre)
+
+
+def time_folder(tree):
+    def run():
+        args_dict = tree.args_dict()
+        return Folder(tree.folders[0], args_dict.get("x_id", "index"), args_dict.get("y_id", "headers"), args_dict)
+    return run
+
+
+def _traces(tree, float32=False):
+    args_dict = tree.args_dict()
+    traces = []
+    for folder in tree.folders:
+        folder_data = Folder(folder, args_dict.get("x_id", "index"), args_dict.get("y_id", "headers"), args_dict)
+        for x, y_traces in zip(folder_data.x, folder_data.y):
+            for trace in y_traces:
+                for y_id, y in trace.items():
+                    x_values = next(iter(x.values()))
+                    if float32:
+                        x_values, y = _as_float32(x_values), _as_float32(y)
+                    traces.append({'type': 'scatter', 'name': f"{folder.name} {y_id}", 'mode': 'markers',
+                                   'x': x_values, 'y': y, 'marker': {'symbol': len(traces) % 55}})
+    return traces
+
+
+def time_figure(tree):
+    traces = _traces(tree)
+    return lambda: build_figure(traces, "x", "y")
+
+
+def time_html(tree, float32=False):
+    fig = build_figure(_traces(tree, float32), "x", "y")
+    html_path = Path(tree.root, "bench_figure.html")
+    return lambda: fig.write_html(html_path, full_html=False, include_plotlyjs='cdn')
+
+
+def time_html_float32(tree):
+    return time_html(tree, float32=True)
+
+
+def time_plot_all(tree):
+    return lambda: plot_all({"data_root": tree.root, "force": True, "show": False, "cache": False})
+
+
+# name: function returning the callable to time, setup done by the function isn't timed
+benchmarks = {
+    "discovery": time_discovery,
+    "hash_cold": time_hash_cold,
+    "hash_warm": time_hash_warm,
+    "hash_strict": time_hash_strict,
+    "read": time_read,
+    "preprocessing": time_preprocessing,
+    "folder": time_folder,
+    "figure": time_figure,
+    "html": time_html,
+    "html_float32": time_html_float32,
+    "plot_all": time_plot_all,
+}
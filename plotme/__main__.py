@@ -1,13 +1,20 @@
 import argparse
 import logging
+import multiprocessing
 import sys
 
 from plotme import helper
+from plotme import profiling
 from plotme import __version__
+from plotme.cache import default_cache_size
+from plotme.export import image_formats
 from plotme.plotting import plot_all
-from plotme.plotting import plot_info_id
+from plotme.plotting import plot_info_id, plotlyjs_file_name, plotlyjs_modes
+from plotme.watch import default_debounce, default_poll_interval, watch
 
 def run():
+    multiprocessing.freeze_support()  # needed by -j in the windows exe
+
     # parse the arguments
     parser = argparse.ArgumentParser(
         description='automates plotting of tabular data, all arguments are optional')
@@ -21,14 +28,61 @@ def run():
                         help="generate a plot_info template")
     parser.add_argument('-f', dest='force', action="store_true",
                         help="force regeneration of all plots")
+    parser.add_argument('--strict-hash', dest='strict_hash', action="store_true",
+                        help="detect changes by hashing the content of every file instead of only changed files")
+    parser.add_argument('-j', '--jobs', dest='jobs', action="store", default=1, type=int,
+                        help="number of plot_info files to process in parallel, default 1")
+    parser.add_argument('--load-workers', dest='load_workers', action="store", default=1, type=int,
+                        help="number of data files in a folder to load in parallel, default 1")
+    parser.add_argument('--load-executor', dest='load_executor', action="store", default='thread',
+                        choices=['thread', 'process'],
+                        help="load data files with a thread (default) or process pool")
+    parser.add_argument('--chunksize', dest='chunksize', action="store", default=100000, type=int,
+                        help="rows read at a time when computing post avg, max or min, default 100000")
+    parser.add_argument('--watch', dest='watch', action="store_true",
+                        help="keep running and regenerate the plots affected by changed files")
+    parser.add_argument('--debounce', dest='debounce', action="store", default=default_debounce, type=float,
+                        help=f"seconds without changes before plots are regenerated in watch mode, "
+                             f"default {default_debounce}")
+    parser.add_argument('--poll', dest='poll', action="store_true",
+                        help="watch by scanning for changes instead of using inotify, e.g. for network shares")
+    parser.add_argument('--poll-interval', dest='poll_interval', action="store", default=default_poll_interval,
+                        type=float, help=f"seconds between scans when polling, default {default_poll_interval}")
     parser.add_argument('-v', dest='report_version', action="store_true",
                         help="report the version of plotme")
     parser.add_argument('--no-html', dest='html', action="store_false",
                         help="save .html file of each plot")
+    parser.add_argument('--plotlyjs', dest='plotlyjs', action="store", default='cdn', choices=plotlyjs_modes,
+                        help=f"how the html files load plotly.js: from the internet (cdn, default), from one "
+                             f"{plotlyjs_file_name} written to the data_root (directory, works offline) or "
+                             f"embedded in every html file (inline, adds ~4.6 MB per plot)")
+    parser.add_argument('--float32', dest='float32', action="store_true",
+                        help="store float trace data as float32 in the html files, about 7 significant digits")
+    parser.add_argument('--low-memory', dest='low_memory', action="store_true",
+                        help="keep only the plotted values of each data file in memory, with --float32 as float32")
+    parser.add_argument('--memory-budget', dest='memory_budget', action="store", default=None, type=float,
+                        help="MB of trace data per plot, the traces are decimated if it is exceeded, "
+                             "implies --low-memory")
     parser.add_argument('--png', dest='png', action="store_true",
-                        help="save .png file of each plot")
+                        help="save .png file of each plot, same as --image-format png")
+    parser.add_argument('--image-format', dest='image_format', action="store", nargs='+', default=[],
+                        choices=image_formats,
+                        help="save an image of each plot in each format, the images of a run are rendered in "
+                             "batches by one renderer")
     parser.add_argument('--quiet', dest='show', action="store_false",
                         help="don't open each plot in a browser tab")
+    parser.add_argument('--no-cache', dest='cache', action="store_false",
+                        help="don't use or update the cache of parsed data files")
+    parser.add_argument('--clear-cache', dest='clear_cache', action="store_true",
+                        help="empty the cache of parsed data files before plotting")
+    parser.add_argument('--cache-size', dest='cache_size', action="store",
+                        default=default_cache_size, type=int,
+                        help=f"maximum size of the parsed data file cache in MB, default {default_cache_size}")
+    parser.add_argument('--incremental', dest='incremental', action="store_true",
+                        help="only parse the rows appended to cached csv files, for log files that keep growing")
+    parser.add_argument('--profile', dest='profile', action="store_true",
+                        help=f"record time, files read and peak memory of each stage and plot_info file in "
+                             f"{profiling.report_file_name} next to the log, tracing memory slows plotme down")
     parser.add_argument('--debug', dest='debug', action="store_true",
                         help="enable debug logging")
 
@@ -46,12 +100,20 @@ def run():
     helper.start_logging(log_level=log_level, log_level_test=args_dict["debug"])
     logging.info(version_info)
 
+    if args_dict['profile']:
+        profiling.start()
     try:
-        plot_all(args_dict)
+        if args_dict['watch']:
+            watch(args_dict)
+        else:
+            plot_all(args_dict)
     except Exception as e:
         logging.exception("Fatal error in main")
         logging.error(e, exc_info=True)
         sys.exit(1)
+    finally:
+        if args_dict['profile']:
+            profiling.write_report(profiling.stop())
 
 
 if __name__ == "__main__":
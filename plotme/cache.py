@@ -0,0 +1,330 @@
+"""
+cache.py contains the on-disk cache of parsed data files
+"""
+import hashlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+from plotme.read import is_csv, is_excel, project, read
+
+default_cache_dir = Path(os.environ.get('PLOTME_CACHE_DIR', Path.home() / ".cache" / "plotme"))
+default_cache_size = 1024  # MB
+data_formats = ["pkl", "parquet"]  # file suffix of the cached data
+tail_check_bytes = 4096  # bytes before the ingested offset that must be unchanged to only parse what was appended
+incremental_kwargs = {'header', 'index_col', 'usecols', 'dtype'}  # read() arguments the appended rows can be read with
+max_parts = 16  # appended rows are stored in up to this many separate files before the entry is written as one
+
+
+class ReadCache(object):
+    """
+    Caches the DataFrames returned by read() so unchanged data files are only parsed once, results
+    derived from a data file can be cached as well using get().
+
+    Each entry is keyed by the resolved file path and the read() key word arguments and is only
+    valid while the file's size and mtime match the ones recorded when it was parsed. Entries are
+    evicted least recently used first once the cache grows beyond max_size.
+
+    Parameters
+    ----------
+    cache_dir: str or Path
+        directory the cache entries are stored in
+    max_size: int
+        maximum size of the cache in MB
+    incremental: bool
+        when a csv file grew, only parse the rows appended since it was cached, as long as its header and the bytes
+        before the cached offset are unchanged, the appended rows are stored next to the entry instead of rewriting it
+    """
+
+    def __init__(self, cache_dir=default_cache_dir, max_size=default_cache_size, incremental=False):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_size * 1024 ** 2
+        self.incremental = incremental
+        # entries used since are kept by prune(), file system timestamps can lag the clock by a tick
+        self.start_time = time.time() - 1
+
+    def _meta_path(self, file_path, kwargs):
+        key_source = json.dumps([str(Path(file_path).resolve()), sorted(kwargs.items())], default=repr)
+        key = hashlib.md5(key_source.encode()).hexdigest()
+        return Path(self.cache_dir, f"{key}.json")
+
+    def read(self, file_path, **kwargs):
+        """
+        read file_path via the cache, kwargs are passed to read() on a cache miss
+        """
+        usecols = kwargs.get('usecols')
+        if is_excel(file_path) and (usecols is None or callable(usecols)):
+            # workbooks are slow to parse, the whole sheet is cached once in a columnar format and every column
+            # selection is taken from it
+            sheet_kwargs = {key: value for key, value in kwargs.items() if key not in ('usecols', 'dtype')}
+            df = self.get(file_path, sheet_kwargs, lambda: read(file_path, **sheet_kwargs), columnar=True)
+            return project(df, usecols, kwargs.get('dtype'))
+        if self.incremental and is_csv(file_path) and set(kwargs) <= incremental_kwargs \
+                and kwargs.get('header', 'infer') in ('infer', 0):
+            return self._read_incremental(file_path, kwargs)
+        return self.get(file_path, kwargs, lambda: read(file_path, **kwargs))
+
+    def get(self, file_path, key_kwargs, compute, columnar=False):
+        """
+        return the cached result of compute() for file_path, computing and caching it on a miss
+
+        Parameters
+        ----------
+        file_path: str or Path
+            data file the result is derived from
+        key_kwargs: dict
+            everything else the result depends on
+        compute: callable
+            returns the result, must be picklable
+        columnar: bool
+            store a DataFrame result as parquet if pyarrow is installed
+        """
+        stat = os.stat(file_path)
+        meta_path = self._meta_path(file_path, key_kwargs)
+        meta, result = self._load(file_path, meta_path, stat)
+        if result is not None:
+            return result
+
+        result = compute()
+        meta = {'file_path': str(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        self._store(meta_path, meta, result, columnar)
+        return result
+
+    def _load(self, file_path, meta_path, stat):
+        """
+        the entry's meta and data, the data is None unless the file is unchanged since the entry was stored
+        """
+        try:
+            with open(meta_path) as json_file:
+                meta = json.load(json_file)
+        except FileNotFoundError:
+            return None, None
+        except Exception as e:
+            logging.debug(f"ignoring unusable cache entry for {file_path}: {e}")
+            return None, None
+        if meta.get('size') != stat.st_size or meta.get('mtime_ns') != stat.st_mtime_ns:
+            return meta, None
+        try:
+            result = self._load_data(meta_path, meta)
+        except Exception as e:
+            logging.debug(f"ignoring unusable cache entry for {file_path}: {e}")
+            return None, None
+        os.utime(meta_path)  # mark as recently used
+        logging.debug(f"read {file_path} from cache")
+        return meta, result
+
+    def _load_data(self, meta_path, meta):
+        import pandas as pd
+
+        data_format = meta.get('format', 'pkl')
+        data_path = meta_path.with_suffix(f".{data_format}")
+        if data_format == 'parquet':
+            return pd.read_parquet(data_path)
+        df = pd.read_pickle(data_path)
+        if meta.get('parts'):
+            df = pd.concat([df] + [pd.read_pickle(_part_path(meta_path, index)) for index in range(meta['parts'])])
+        return df
+
+    def _read_incremental(self, file_path, kwargs):
+        """
+        read() a csv file, parsing only the rows appended since the cached entry was stored if the file grew
+        """
+        import pandas as pd
+
+        stat = os.stat(file_path)
+        meta_path = self._meta_path(file_path, kwargs)
+        meta, df = self._load(file_path, meta_path, stat)
+        if df is not None:
+            return df
+
+        with open(file_path, "rb") as data_file:
+            header_line = data_file.readline()
+            offset = (meta or {}).get('offset')
+            if offset is not None and offset <= stat.st_size \
+                    and meta.get('header_md5') == hashlib.md5(header_line).hexdigest() \
+                    and meta.get('tail_md5') == _tail_md5(data_file, offset):
+                try:
+                    cached = self._load_data(meta_path, meta)
+                except Exception as e:
+                    logging.debug(f"ignoring unusable cache entry for {file_path}: {e}")
+                    cached = None
+                if cached is not None:
+                    data_file.seek(offset)
+                    appended = data_file.read(stat.st_size - offset)
+                    tail, n_bytes = self._parse_tail(cached, appended, meta['columns'], kwargs)
+                    df = cached if tail is None else pd.concat([cached, tail])
+                    logging.debug(f"parsed {n_bytes} bytes appended to {file_path}, {len(df) - meta['rows']} rows")
+                    # a last line still being written is parsed on the next run
+                    # only the appended rows are written, until there are max_parts of them
+                    parts = meta.get('parts', 0)
+                    self._store_incremental(meta_path, file_path, stat, df, data_file, header_line, offset + n_bytes,
+                                            meta['columns'], parts=parts if parts < max_parts else None, tail=tail)
+                    return df
+
+            df = read(file_path, **kwargs)
+            columns = pd.read_csv(io.BytesIO(header_line), nrows=0).columns.to_list()
+            # a file that doesn't end with a new line may be part way through writing a row
+            data_file.seek(max(stat.st_size - 1, 0))
+            complete = data_file.read(1) == b"\n"
+            self._store_incremental(meta_path, file_path, stat, df, data_file, header_line,
+                                    stat.st_size if complete else None, columns)
+        return df
+
+    @staticmethod
+    def _parse_tail(cached, appended, columns, kwargs):
+        """
+        the complete lines of appended parsed to follow cached, None if there are none, and the number of bytes parsed
+        """
+        import pandas as pd
+
+        n_bytes = appended.rfind(b"\n") + 1
+        if n_bytes == 0:
+            return None, 0
+        tail_kwargs = {key: value for key, value in kwargs.items() if key != 'header'}
+        tail = pd.read_csv(io.BytesIO(appended[:n_bytes]), header=None, names=columns, **tail_kwargs)
+        if kwargs.get('index_col') is None:
+            tail.index = pd.RangeIndex(len(cached), len(cached) + len(tail))
+        else:
+            tail.index.names = cached.index.names
+        return tail, n_bytes
+
+    def _store_incremental(self, meta_path, file_path, stat, df, data_file, header_line, offset, columns, parts=None,
+                           tail=None):
+        """
+        store df as one file, or if parts is given only store its appended tail as the entry's next part
+        """
+        meta = {'file_path': str(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'offset': offset,
+                'rows': len(df), 'columns': columns, 'header_md5': hashlib.md5(header_line).hexdigest()}
+        if offset is not None:
+            meta['tail_md5'] = _tail_md5(data_file, offset)
+        if parts is None:
+            self._store(meta_path, meta, df)
+            for part_path in self.cache_dir.glob(f"{meta_path.stem}.*.pkl"):
+                part_path.unlink(missing_ok=True)
+            return
+
+        import pandas as pd
+
+        meta['format'] = 'pkl'
+        meta['parts'] = parts
+        try:
+            if tail is not None:
+                part_path = _part_path(meta_path, parts)
+                tmp_part_path = part_path.with_name(f"{part_path.name}.{os.getpid()}.tmp")
+                pd.to_pickle(tail, tmp_part_path)
+                os.replace(tmp_part_path, part_path)
+                meta['parts'] = parts + 1
+            self._write_meta(meta_path, meta)
+        except Exception as e:
+            logging.warning(f"unable to cache {meta['file_path']}: {e}")
+
+    def _store(self, meta_path, meta, result, columnar=False):
+        import pandas as pd
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # write to temporary files first so an interrupted run can't leave a half written entry
+            tmp_suffix = f".{os.getpid()}.tmp"
+            meta['format'] = 'pkl'
+            if columnar and isinstance(result, pd.DataFrame) and importlib.util.find_spec('pyarrow') is not None:
+                tmp_data_path = meta_path.with_name(f"{meta_path.stem}.parquet{tmp_suffix}")
+                try:
+                    result.to_parquet(tmp_data_path)
+                    meta['format'] = 'parquet'
+                except Exception as e:  # e.g. column names that aren't strings
+                    logging.debug(f"storing {meta['file_path']} as pickle, not parquet: {e}")
+            if meta['format'] == 'pkl':
+                tmp_data_path = meta_path.with_name(f"{meta_path.stem}.pkl{tmp_suffix}")
+                pd.to_pickle(result, tmp_data_path)
+            os.replace(tmp_data_path, meta_path.with_suffix(f".{meta['format']}"))
+            self._write_meta(meta_path, meta)
+        except Exception as e:
+            logging.warning(f"unable to cache {meta['file_path']}: {e}")
+
+    @staticmethod
+    def _write_meta(meta_path, meta):
+        tmp_meta_path = meta_path.with_name(f"{meta_path.name}.{os.getpid()}.tmp")
+        with open(tmp_meta_path, "w") as json_file:
+            json.dump(meta, json_file)
+        os.replace(tmp_meta_path, meta_path)
+
+    def _entries(self):
+        """
+        {meta path: paths of the entry's files}, data files whose meta file is missing are left out
+        """
+        entry_paths = {}
+        for path in self.cache_dir.iterdir():
+            key = _entry_key(path)
+            if key is not None and path.suffix != ".tmp":
+                entry_paths.setdefault(key, []).append(path)
+        return {Path(self.cache_dir, f"{key}.json"): paths for key, paths in entry_paths.items()
+                if Path(self.cache_dir, f"{key}.json") in paths}
+
+    def prune(self):
+        """
+        evict the least recently used entries until the cache is smaller than max_size, entries used since the cache
+        was created aren't evicted
+        """
+        if not self.cache_dir.is_dir():
+            return
+
+        entries = []
+        total_bytes = 0
+        for meta_path, entry_paths in self._entries().items():
+            try:
+                last_used = meta_path.stat().st_mtime
+                entry_bytes = sum(path.stat().st_size for path in entry_paths)
+            except FileNotFoundError:
+                continue
+            entries.append((last_used, entry_bytes, entry_paths))
+            total_bytes += entry_bytes
+
+        entries.sort(key=lambda entry: entry[0])
+        for last_used, entry_bytes, entry_paths in entries:
+            if total_bytes <= self.max_bytes or last_used >= self.start_time:
+                break
+            for path in entry_paths:
+                path.unlink(missing_ok=True)
+            total_bytes -= entry_bytes
+        if total_bytes > self.max_bytes:
+            logging.warning(f"the read cache entries of this run take {total_bytes / 1024 ** 2:.1f} MB, more than "
+                            f"the cache size of {self.max_bytes / 1024 ** 2:.0f} MB, increase --cache-size to keep them")
+        logging.debug(f"read cache size: {total_bytes / 1024 ** 2:.1f} MB")
+
+    def clear(self):
+        """
+        remove every entry from the cache, other files in cache_dir are left alone
+        """
+        if self.cache_dir.is_dir():
+            for path in self.cache_dir.iterdir():
+                if _entry_key(path) is not None:
+                    path.unlink(missing_ok=True)
+            logging.info(f"cleared read cache {self.cache_dir}")
+
+
+def _entry_key(path):
+    """
+    the key of a file written by the cache, e.g. key.json, key.pkl, key.0.pkl or their temporary files, None for
+    other files
+    """
+    key, _, suffix = path.name.partition(".")
+    if len(key) != 32 or any(char not in "0123456789abcdef" for char in key):
+        return None
+    if any(part in ["json"] + data_formats for part in suffix.split(".")):
+        return key
+    return None
+
+
+def _part_path(meta_path, index):
+    return meta_path.with_name(f"{meta_path.stem}.{index}.pkl")
+
+
+def _tail_md5(data_file, offset):
+    # md5 of the bytes just before offset, the file was rewritten rather than appended to if they changed
+    start = max(offset - tail_check_bytes, 0)
+    data_file.seek(start)
+    return hashlib.md5(data_file.read(offset - start)).hexdigest()
@@ -0,0 +1,198 @@
+"""
+config.py contains the plot configuration, plot_info files are validated once per change and turned into a read only
+PlotConfig that single_plot and Folder read their settings from
+"""
+import copy
+import json
+import os
+from pathlib import Path
+
+from plotme.export import requested_image_formats
+from plotme.helper import strip_white_space
+from plotme.schema import schema
+
+default_webgl_threshold = 100000  # points in a trace
+
+# attribute: (key in the plot_info file or arguments, a tuple for keys nested under 'schema', default)
+fields = {
+    'plot_dir': ('plot_dir', Path.home()),
+    'plot_info_file': ('plot_info_file', None),
+    'not_a_plot': ('not_a_plot', False),
+    'title_text': ('title_text', 'plotme plot'),
+    'pio_template': ('pio.template', "plotly_white"),
+    'height': ('height', 600),
+    'width': ('width', 1000),
+    'x_id': ('x_id', 'index'),
+    'x_title': ('x_title', None),
+    'y_id': ('y_id', 'headers'),
+    'y_title': ('y_title', None),
+    'trace_mode': ('trace_mode', 'markers'),
+    'marker_symbols': ('marker_symbols', None),
+    'showlegend': ('showlegend', True),
+    'update_traces_kwargs': ('update_traces_kwargs', {}),
+    'update_layout_kwargs': ('update_layout_kwargs', {}),
+    'x_axes_kwargs': ('x_axes_kwargs', {}),
+    'y_axes_kwargs': ('y_axes_kwargs', {}),
+    'xaxes_visible': ('xaxes_visible', True),
+    'yaxes_visible': ('yaxes_visible', True),
+    'folder_include_filter': ('folder_include_filter', None),
+    'folder_exclude_filter': ('folder_exclude_filter', None),
+    'constant_lines': ('constant_lines', {}),
+    'webgl_threshold': ('webgl_threshold', default_webgl_threshold),
+    'decimate': ('decimate', {}),
+    'error_y': ('error_y', {}),
+    'float32': ('float32', False),
+    'low_memory': ('low_memory', False),
+    'memory_budget': ('memory_budget', None),
+    'pre': ('pre', []),
+    'post': ('post', None),
+    'file_include_filter': (('schema', 'file_include_filter'), None),
+    'file_exclude_filter': (('schema', 'file_exclude_filter'), None),
+    'file_extension': (('schema', 'file_extension'), ['csv', 'xlsx', 'xls']),
+    'header': (('schema', 'header'), 'infer'),
+    'index_col': (('schema', 'index_col'), None),
+    'x_id_in_file_name': (('schema', 'x_id_in_file_name'), False),
+    'x_id_is_reg_exp': (('schema', 'x_id_is_reg_exp'), False),
+    'x_time_format': (('schema', 'x_time_format'), None),
+    'trace_label': (('schema', 'trace_label'), 'file_name'),
+    'remove_from_trace_label': (('schema', 'remove_from_trace_label'), ""),
+    # command line arguments
+    'data_root': ('data_root', None),
+    'html': ('html', True),
+    'plotlyjs': ('plotlyjs', 'cdn'),
+    'image_formats': ('image_format', []),
+    'show': ('show', True),
+    'chunksize': ('chunksize', 100000),
+    'load_workers': ('load_workers', 1),
+    'load_executor': ('load_executor', 'thread'),
+    # shared by all plots of a run
+    'read_cache': ('read_cache', None),
+    'dir_index': ('dir_index', None),
+    'folder_memo': ('folder_memo', None),
+    'image_batch': ('image_batch', None),
+}
+
+_validator = None
+_plot_info_cache = {}  # {absolute path: {'signature': (size, mtime_ns), 'plot_info', 'valid'}}
+
+
+class PlotConfig(object):
+    """
+    Read only settings of one plot, the plot_info file's settings on top of the arguments with the defaults filled in.
+
+    x_id and y_id have their white space stripped, x_title and y_title default to them and file_extension is always
+    a list.
+
+    Parameters
+    ----------
+    args_dict: dict
+        arguments updated with the plot_info file's settings
+    """
+    __slots__ = tuple(fields)
+
+    def __init__(self, args_dict={}):
+        plot_schema = args_dict.get('schema', {})
+        for name, (key, default) in fields.items():
+            if isinstance(key, tuple):
+                value = plot_schema.get(key[1], default)
+            else:
+                value = args_dict.get(key, default)
+            if value is default and isinstance(default, (dict, list)):
+                value = copy.copy(default)
+            object.__setattr__(self, name, value)
+
+        object.__setattr__(self, 'x_id', strip_white_space(self.x_id))
+        object.__setattr__(self, 'y_id', strip_white_space(self.y_id))
+        if self.x_title is None:
+            object.__setattr__(self, 'x_title', self.x_id)
+        if self.y_title is None:
+            object.__setattr__(self, 'y_title', self.y_id)
+        if isinstance(self.file_extension, str):
+            object.__setattr__(self, 'file_extension', [self.file_extension])
+        object.__setattr__(self, 'image_formats', requested_image_formats(args_dict))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"PlotConfig is read only, can't set {name}")
+
+    def __repr__(self):
+        return f"PlotConfig(plot_info_file={self.plot_info_file!r})"
+
+
+class PlotState(object):
+    """
+    what the folders of one plot share while it is being made
+
+    Parameters
+    ----------
+    min_timestamp: float
+        time stamp of the first file of the plot, x values taken from time stamps in file names are relative to it
+    """
+    __slots__ = ('min_timestamp',)
+
+    def __init__(self, min_timestamp=None):
+        self.min_timestamp = min_timestamp
+
+
+def as_plot_config(args):
+    """
+    args as a PlotConfig, args can be a PlotConfig or an args_dict
+    """
+    if isinstance(args, PlotConfig):
+        return args
+    return PlotConfig(args)
+
+
+def plot_info_validator():
+    """
+    the jsonschema validator of plot_info files, checked and created on first use
+    """
+    global _validator
+    if _validator is None:
+        from jsonschema.validators import validator_for
+
+        validator_class = validator_for(schema)
+        validator_class.check_schema(schema)
+        _validator = validator_class(schema)
+    return _validator
+
+
+def validate_plot_info(plot_info):
+    """
+    raise the same jsonschema.ValidationError jsonschema.validate would if plot_info is invalid
+    """
+    from jsonschema.exceptions import best_match
+
+    error = best_match(plot_info_validator().iter_errors(plot_info))
+    if error is not None:
+        raise error
+
+
+def load_plot_info(file, validate=True):
+    """
+    read and validate a plot_info file, the result is reused until the file's size or mtime change
+
+    Parameters
+    ----------
+    file: str or Path
+        plot_info file
+    validate: bool
+        raise jsonschema.ValidationError if the file is invalid, False to only read it, e.g. to check whether the
+        plot changed without importing jsonschema
+
+    Returns
+    -------
+    dict
+        a copy of the plot_info file's content that the caller is free to change
+    """
+    stat = os.stat(file)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    key = os.path.abspath(file)
+    cached = _plot_info_cache.get(key)
+    if cached is None or cached['signature'] != signature:
+        with open(file) as json_file:
+            cached = {'signature': signature, 'plot_info': json.load(json_file), 'valid': False}
+        _plot_info_cache[key] = cached
+    if validate and not cached['valid']:
+        validate_plot_info(cached['plot_info'])
+        cached['valid'] = True
+    return copy.deepcopy(cached['plot_info'])
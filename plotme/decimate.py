@@ -0,0 +1,105 @@
+"""
+decimate.py contains the shape preserving down sampling used to limit the number of points per trace
+"""
+import logging
+
+import numpy as np
+
+decimate_methods = ["lttb", "minmax"]
+
+
+def lttb_indices(x, y, n_out):
+    """
+    indices of the points kept by the largest triangle three buckets algorithm
+
+    the first and last point are always kept, the remaining points are split into n_out - 2 buckets and from each
+    bucket the point forming the largest triangle with the previously kept point and the average of the next bucket
+    is kept
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    edges = np.append(edges, n)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2]
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        areas = np.abs((x[a] - avg_x) * (bucket_y - y[a]) - (x[a] - bucket_x) * (avg_y - y[a]))
+        a = start + np.argmax(np.nan_to_num(areas, nan=-1.))
+        indices[i + 1] = a
+    return indices
+
+
+def minmax_indices(y, n_out):
+    """
+    indices of the minimum and maximum point of n_out / 2 equal sized buckets plus the first and last point
+    """
+    n = len(y)
+    n_buckets = max(n_out // 2, 1)
+    if n_out >= n:
+        return np.arange(n)
+
+    bucket_size = -(-n // n_buckets)  # ceil
+    padded = np.full(bucket_size * n_buckets, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, bucket_size)
+    offsets = np.arange(n_buckets) * bucket_size
+    # nan never wins, all nan buckets pick their first point
+    mins = offsets + np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1)
+    maxs = offsets + np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1)
+    indices = np.unique(np.concatenate(([0, n - 1], mins, maxs)))
+    return indices[indices < n]
+
+
+def decimate(x, y, n_points, method="lttb"):
+    """
+    reduce a trace to about n_points while preserving its shape
+
+    Parameters
+    ----------
+    x: numpy array
+        x values, numeric or datetime values are used as is, anything else is replaced by the point's position
+    y: numpy array
+        y values, only numeric y values are decimated
+    n_points: int
+        target number of points
+    method: str
+        'lttb' or 'minmax'
+
+    Returns
+    -------
+    numpy array, numpy array
+        decimated x and y
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(y) <= n_points:
+        return x, y
+    if not np.issubdtype(y.dtype, np.number):
+        logging.warning(f"can't decimate non-numeric y values of dtype {y.dtype}")
+        return x, y
+
+    y_numeric = y.astype(float)
+    if method == "lttb":
+        if np.issubdtype(x.dtype, np.number):
+            x_numeric = x.astype(float)
+        elif np.issubdtype(x.dtype, np.datetime64) or np.issubdtype(x.dtype, np.timedelta64):
+            x_numeric = x.view(np.int64).astype(float)
+        else:
+            x_numeric = np.arange(len(x), dtype=float)
+        indices = lttb_indices(x_numeric, y_numeric, n_points)
+    elif method == "minmax":
+        indices = minmax_indices(y_numeric, n_points)
+    else:
+        raise ValueError(f"Unexpected decimate method: {method}, options are {', '.join(decimate_methods)}")
+
+    return x[indices], y[indices]
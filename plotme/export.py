@@ -0,0 +1,87 @@
+"""
+export.py contains the image export, figures are collected and rendered in batches by one renderer instead of
+starting a renderer for every image
+"""
+import logging
+
+from plotme import profiling
+
+image_formats = ["png", "jpg", "jpeg", "webp", "svg", "pdf"]
+default_batch_size = 50  # figures held in memory until they are exported
+
+
+def requested_image_formats(args_dict):
+    """
+    image formats to export from --image-format, --png adds png
+    """
+    formats = list(args_dict.get('image_format') or [])
+    if args_dict.get('png') and 'png' not in formats:
+        formats.append('png')
+    return formats
+
+
+class ImageBatch(object):
+    """
+    Figures waiting to be exported as images, flush() renders all of them with one kaleido renderer.
+
+    Parameters
+    ----------
+    max_figures: int
+        number of images after which full() is True
+    """
+
+    def __init__(self, max_figures=default_batch_size):
+        self.max_figures = max_figures
+        self.figures = []
+        self.files = []
+        self.formats = []
+
+    def __len__(self):
+        return len(self.files)
+
+    def add(self, fig, file_path_no_ext, formats):
+        """
+        queue fig to be saved as file_path_no_ext.format for each format
+        """
+        for image_format in formats:
+            self.figures.append(fig)
+            self.files.append(f"{file_path_no_ext}.{image_format}")
+            self.formats.append(image_format)
+
+    def entries(self):
+        """
+        the queued images as (figure dict, file, format), small enough to send to another process
+        """
+        return [(fig.to_dict() if hasattr(fig, 'to_dict') else fig, file, image_format)
+                for fig, file, image_format in zip(self.figures, self.files, self.formats)]
+
+    def extend(self, entries):
+        """
+        queue the images returned by another batch's entries()
+        """
+        for fig, file, image_format in entries:
+            self.figures.append(fig)
+            self.files.append(file)
+            self.formats.append(image_format)
+
+    def full(self):
+        return len(self.files) >= self.max_figures
+
+    def flush(self):
+        """
+        export the queued images and empty the batch
+        """
+        if not self.files:
+            return
+        import plotly.io as pio
+
+        with profiling.stage("write_image"):
+            if hasattr(pio, 'write_images'):
+                pio.write_images(self.figures, self.files, format=self.formats)
+            else:  # plotly < 6.1 starts a renderer per image
+                for fig, file, image_format in zip(self.figures, self.files, self.formats):
+                    pio.write_image(fig, file, format=image_format)
+        logging.info(f"exported {len(self.files)} images")
+        self.figures = []
+        self.files = []
+        self.formats = []
@@ -0,0 +1,146 @@
+"""
+hashing.py contains the change detection used to decide if a plot needs to be regenerated
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+
+from plotme.index import DirIndex
+
+# files whose mtime is this close to the start of the scan could still be written to within the
+# same mtime tick, their content hash is not reused on the next run
+racy_window_ns = 2 * 10 ** 9
+
+
+def file_md5(file_path, block_size=2 ** 20, start=0, end=None, seed=""):
+    """
+    md5 hex digest of a file's content, read in blocks
+
+    Parameters
+    ----------
+    file_path: str or Path
+        file to hash
+    block_size: int
+        number of bytes read at a time
+    start: int
+        offset to start reading at
+    end: int
+        offset to stop reading at, the end of the file if None
+    seed: str
+        hashed before the content, e.g. the digest of the bytes before start
+    """
+    md5 = hashlib.md5(seed.encode())
+    with open(file_path, "rb") as data_file:
+        data_file.seek(start)
+        remaining = float('inf') if end is None else end - start
+        while remaining > 0:
+            block = data_file.read(int(min(block_size, remaining)))
+            if not block:
+                break
+            md5.update(block)
+            remaining -= len(block)
+    return md5.hexdigest()
+
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path) as json_file:
+            return json.load(json_file)
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        logging.warning(f"ignoring unreadable manifest {manifest_path}")
+        return {}
+
+
+def save_manifest(manifest_path, manifest):
+    with open(manifest_path, "w") as json_file:
+        json.dump(manifest, json_file)
+
+
+def stat_dir_hash(dir_path, ignore=(), previous_manifest=None, dir_index=None):
+    """
+    Hash the content of every file under dir_path, only reading files whose size, mtime or inode
+    differ from previous_manifest.
+
+    Parameters
+    ----------
+    dir_path: str or Path
+        directory to hash recursively
+    ignore: iterable
+        file name patterns to leave out of the hash
+    previous_manifest: dict
+        manifest returned by the previous call for this directory
+    dir_index: DirIndex
+        index containing dir_path, the directory is scanned if None
+
+    Returns
+    -------
+    str, dict
+        hash of the directory and the manifest of {relative path: [size, mtime_ns, inode, md5]}
+    """
+    if dir_index is None:
+        dir_index = DirIndex(dir_path)
+    files = [os.path.join(directory, name) for directory, names in dir_index.walk(dir_path) for name in names
+             if not any(fnmatch(name, pattern) for pattern in ignore)]
+    return stat_files_hash(dir_path, files, previous_manifest, dir_index)
+
+
+def stat_files_hash(dir_path, files, previous_manifest=None, dir_index=None, appended=None):
+    """
+    Hash the content of files, only reading files whose size, mtime or inode differ from previous_manifest.
+
+    Parameters
+    ----------
+    dir_path: str or Path
+        directory the files are under, the manifest and hash use paths relative to it
+    files: iterable
+        files to hash
+    previous_manifest: dict
+        manifest returned by the previous call for the same dir_path, every file is read if None
+    dir_index: DirIndex
+        index containing the files, their stat is looked up with os.stat if None
+    appended: callable
+        appended(file_path) is True for files that are only ever appended to, e.g. logs parsed with --incremental,
+        when such a file grew only the bytes added since previous_manifest are hashed, chained to its previous digest
+
+    Returns
+    -------
+    str, dict
+        hash of the files and the manifest of {relative path: [size, mtime_ns, inode, md5]}
+    """
+    previous_manifest = previous_manifest or {}
+    scan_start_ns = time.time_ns()
+    manifest = {}
+    append_only = set()
+    for file_path in files:
+        stat = dir_index.stat(file_path) if dir_index is not None else os.stat(file_path)
+        rel_path = Path(os.path.relpath(file_path, dir_path)).as_posix()
+        signature = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+        previous = previous_manifest.get(rel_path)
+        if appended is not None and appended(file_path):
+            append_only.add(rel_path)
+        if previous and previous[:3] == signature and previous[3] is not None:
+            digest = previous[3]
+        elif rel_path in append_only and previous and previous[3] is not None \
+                and previous[2] == stat.st_ino and previous[0] < stat.st_size:
+            digest = file_md5(file_path, start=previous[0], end=stat.st_size, seed=previous[3])
+        else:
+            digest = file_md5(file_path)
+        manifest[rel_path] = signature + [digest]
+
+    files_md5 = hashlib.md5()
+    for rel_path in sorted(manifest):
+        files_md5.update(f"{rel_path}\0{manifest[rel_path][3]}\n".encode())
+
+    # don't trust the recorded digest of files that may still change within the same mtime tick, appending changes
+    # the size so the digest of append only files is kept, else a log being written to is read in full every run
+    for rel_path, entry in manifest.items():
+        if entry[1] >= scan_start_ns - racy_window_ns and rel_path not in append_only:
+            entry[3] = None
+
+    return files_md5.hexdigest(), manifest
@@ -0,0 +1,116 @@
+"""
+index.py contains the in-memory index of the directory tree, built with a single os.scandir walk per run
+"""
+import logging
+import os
+from fnmatch import fnmatch
+from pathlib import Path
+
+
+def _key(directory):
+    return os.path.normpath(str(directory))
+
+
+class DirIndex(object):
+    """
+    Every directory, file and file stat under root, read once and shared by plot_info discovery, change detection,
+    the folder walk and data file matching.
+
+    Entries keep the order os.scandir returned them in, the same order glob used.
+
+    Parameters
+    ----------
+    root: str or Path
+        directory to index recursively
+    """
+
+    def __init__(self, root, _dirs=None):
+        self.root = Path(root)
+        # {directory: {'dirs': [sub directory names], 'files': {file name: os.stat_result}}}
+        self.dirs = {} if _dirs is None else _dirs
+        if _dirs is None:
+            self._scan(self.root)
+
+    def _scan(self, root):
+        # each directory is scanned with the real paths of its parents to detect linked directories going in circles
+        stack = [(_key(root), frozenset())]
+        while stack:
+            directory, parents = stack.pop()
+            real_directory = os.path.realpath(directory)
+            if real_directory in parents:
+                logging.debug(f"not following {directory}, it links to one of its parents")
+                self.dirs[directory] = {'dirs': [], 'files': {}}
+                continue
+            parents = parents | {real_directory}
+
+            sub_dirs = []
+            files = {}
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir():
+                                sub_dirs.append(entry.name)
+                            elif entry.is_file():
+                                files[entry.name] = entry.stat()
+                        except OSError as e:  # e.g. broken link
+                            logging.debug(f"skipping {entry.path}: {e}")
+            except OSError as e:
+                logging.warning(f"unable to read directory {directory}: {e}")
+            self.dirs[directory] = {'dirs': sub_dirs, 'files': files}
+            # reversed so the stack pops sub directories in scandir order
+            stack.extend((_key(os.path.join(directory, name)), parents) for name in reversed(sub_dirs))
+
+    def _entry(self, directory):
+        key = _key(directory)
+        if key not in self.dirs:
+            # outside the indexed tree
+            self._scan(key)
+        return self.dirs[key]
+
+    def files(self, directory, pattern="*"):
+        """
+        paths of the files directly in directory whose name matches the glob style pattern
+        """
+        return [Path(directory, name) for name in self._entry(directory)['files'] if fnmatch(name, pattern)]
+
+    def stat(self, file_path):
+        file_path = Path(file_path)
+        return self._entry(file_path.parent)['files'][file_path.name]
+
+    def find_files(self, pattern, directory=None):
+        """
+        paths of the files at any depth under directory (default root) whose name matches the glob style pattern
+        """
+        return [Path(sub_dir, name) for sub_dir, files in self.walk(directory)
+                for name in files if fnmatch(name, pattern)]
+
+    def folders(self, directory, include_hidden=False):
+        """
+        directory followed by all its sub directories at any depth, hidden directories and their content are left
+        out unless include_hidden
+        """
+        folders = []
+        stack = [_key(directory)]
+        while stack:
+            folder = stack.pop()
+            folders.append(folder)
+            names = [name for name in self._entry(folder)['dirs'] if include_hidden or not name.startswith('.')]
+            stack.extend(_key(os.path.join(folder, name)) for name in reversed(names))
+        return folders
+
+    def walk(self, directory=None):
+        """
+        yields (directory, {file name: os.stat_result}) for directory (default root) and every sub directory
+        """
+        if directory is None:
+            directory = self.root
+        for folder in self.folders(directory, include_hidden=True):
+            yield folder, self._entry(folder)['files']
+
+    def subtree(self, directory):
+        """
+        index of only directory and its sub directories, small enough to send to another process
+        """
+        return DirIndex(directory, _dirs={folder: self._entry(folder)
+                                          for folder in self.folders(directory, include_hidden=True)})
@@ -1,13 +1,20 @@
+import io
 import logging
 import re
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from difflib import get_close_matches
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 
 import numpy as np
+import pandas as pd
 
-from plotme.read import read
+from plotme import profiling
+from plotme.config import PlotState, as_plot_config
+from plotme.read import ColumnSelector, is_csv, is_streamed, read, read_chunks
+from plotme.selection import check_filter_match, select_data_files  # check_filter_match is kept importable from here
 
 
 def fuzzy_match_column(target_column, available_columns, cutoff=0.6):
@@ -49,114 +56,423 @@ def pre_process_abs_sum_remove(df, to_remove=0., col_1='', col_2=''):
     return df
 
 
+row_filter_steps = ["remove_null", "remove_zero", "remove_strings"]
+post_functions = {'avg': np.average, 'max': np.max, 'min': np.min}
+# like np.max/np.min of a Series, these skip missing values when reducing arrays
+post_reductions = {'max': np.fmax.reduce, 'min': np.fmin.reduce}
+point_batch_bytes = 2 ** 24  # small files sharing a header are parsed together in batches of up to this many bytes
+
+
+def string_free_rows(df):
+    """
+    boolean row mask, True where the row doesn't contain any string value
+
+    only columns that can hold strings are checked and columns holding nothing but strings and nulls are checked
+    without looking at each value
+    """
+    keep = np.ones(len(df), dtype=bool)
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        dtype = column.dtype
+        if isinstance(dtype, pd.StringDtype):
+            keep &= column.isna().to_numpy()
+        elif (pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype)
+                or pd.api.types.is_timedelta64_dtype(dtype)):
+            continue
+        else:
+            inferred = pd.api.types.infer_dtype(column, skipna=True)
+            if inferred == 'string':
+                keep &= column.isna().to_numpy()
+            elif 'mixed' in inferred or inferred in ('categorical', 'unknown-array'):
+                values = column.to_numpy(dtype=object)
+                keep &= np.fromiter((not isinstance(x, str) for x in values), dtype=bool, count=len(values))
+    return keep
+
+
 def preprocessing(df, pre):
-    # use loop to sequence pre-processing steps
+    # use loop to sequence pre-processing steps, the row filtering steps are combined into one mask that is
+    # applied once, converting applies the mask first because later steps must see the converted values
+    keep = None
     for step in pre:
         match step:
             case "remove_null":
-                df = df.dropna()
+                step_keep = df.notna().all(axis=1).to_numpy()
             case "remove_zero":
-                df = df.loc[(df!=0).all(axis=1)]
+                step_keep = (df != 0).all(axis=1).to_numpy()
             case "remove_strings":
                 # Remove rows containing any string value
-                df = df.loc[df.map(lambda x: not isinstance(x, str)).all(axis=1)]
+                step_keep = string_free_rows(df)
             case "convert_to_float":
                 # Convert all cells in dataframe to float
+                df = _apply_row_mask(df, keep)
+                keep = None
                 df = df.astype(float)
+                continue
             case _:  # Default case (optional)
                 logging.warning(f"Unknown preprocessing step: {step}")
-    return df
+                continue
+        keep = step_keep if keep is None else keep & step_keep
+    return _apply_row_mask(df, keep)
 
 
-def check_filter_match(filter_value, filename):
+def compact_array(values, float32=False):
     """
-    Check if filename matches any filter criteria.
-    
-    Parameters:
-    -----------
-    filter_value : str or iterable
-        Filter criteria - can be a single string or an iterable of strings
-    filename : str
-        The filename to check against the filter
-        
-    Returns:
-    --------
-    bool : True if any filter matches, False otherwise
+    values as a contiguous array that owns its memory, float64 values as float32 if float32
     """
-    if filter_value is None:
-        return False
-    
-    # Convert string to list for uniform processing
-    if isinstance(filter_value, str):
-        filters = [filter_value]
-    else:
-        # Handle any iterable (list, tuple, set, etc.)
-        try:
-            filters = list(filter_value)
-        except TypeError:
-            # If it's not iterable, treat as single string
-            filters = [str(filter_value)]
-    
-    # Check if any filter matches the filename
-    for filter_item in filters:
-        if filter_item in filename:
-            return True
-    
-    return False
+    values = np.asarray(values)
+    if float32 and values.dtype == np.float64:
+        return values.astype(np.float32)
+    if values.base is not None or not values.flags.c_contiguous:
+        return values.copy()
+    return values
+
+
+def parse_time_stamps(strings, time_format):
+    """
+    datetime.strptime(string, time_format).timestamp() of each string as an array, parsed all at once
+    """
+    try:
+        parsed = pd.to_datetime(pd.Series(strings), format=time_format).dt.to_pydatetime()
+    except (ValueError, TypeError):
+        # formats pandas doesn't support, strptime raises its own error for strings that don't match
+        parsed = [datetime.strptime(string, time_format) for string in strings]
+    # naive datetimes are local time, the same as strptime's
+    return np.array([date_time.timestamp() for date_time in parsed])
+
+
+def post_values_of(dfs, y_id, post):
+    """
+    the post aggregate ('avg', 'max' or 'min') of column y_id of each DataFrame, computed for all of them at once
+
+    like np.average, np.max and np.min of each column avg includes nulls and max and min skip them
+    """
+    columns = [df[y_id].to_numpy() for df in dfs]
+    lengths = np.array([len(column) for column in columns])
+    if len(columns) == 0 or lengths.min() == 0 or any(column.dtype.kind not in 'iuf' for column in columns):
+        # empty and non numeric columns raise the same errors as before
+        return [post_functions[post](df[y_id]) for df in dfs]
+    return reduce_groups(np.concatenate(columns), lengths, post)
+
+
+def reduce_groups(values, lengths, post):
+    """
+    the post aggregate of each group of consecutive values, the groups are lengths long and not empty
+    """
+    if (lengths == lengths[0]).all():
+        # rows are summed the same way as the whole column would be
+        values = values.reshape(len(lengths), lengths[0])
+        match post:
+            case 'avg':
+                return values.mean(axis=1)
+            case 'max':
+                return np.fmax.reduce(values, axis=1)
+            case _:
+                return np.fmin.reduce(values, axis=1)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    match post:
+        case 'avg':
+            return np.add.reduceat(values, starts) / lengths
+        case 'max':
+            return np.fmax.reduceat(values, starts)
+        case _:
+            return np.fmin.reduceat(values, starts)
+
+
+def load_point_batches(files, y_ids=[], post='avg', read_kwargs={}, pre=[], chunksize=100000):
+    """
+    compute the post-processing aggregates of the small csv files that share a header line by parsing them together,
+    parsing a small file takes longer than reading it
+
+    Parameters
+    ----------
+    files: list
+        data files of a folder
+    y_ids: list
+        columns to aggregate
+    post: str
+        'avg', 'max' or 'min'
+    read_kwargs: dict
+        key word arguments passed to read()
+    pre: list
+        pre-processing steps
+    chunksize: int
+        files read_chunks() would stream aren't batched
+
+    Returns
+    -------
+    list
+        {y_id: aggregate} of each file, None for the files that have to be loaded one by one, e.g. larger files,
+        all files when pre filters rows, files with quoted values, which could hold a new line, and batches that fail to parse or pre-process or whose
+        y_id columns aren't numeric
+    """
+    results = [None] * len(files)
+    if read_kwargs.get('index_col') is not None or read_kwargs.get('header', 'infer') not in ('infer', 0):
+        return results
+    # the column types of a batch are inferred over all of its files, e.g. a column holding numbers in one file and
+    # text in another is text in every row, row filters would then drop other rows than they do file by file
+    if any(step in row_filter_steps for step in pre):
+        return results
+
+    pending = {}  # header line: indices, bodies and bytes of the files waiting to be parsed together
+
+    with profiling.stage("load/read") as record:
+        def parse(header):
+            indices, bodies, _ = pending.pop(header)
+            post_values = _parse_point_batch(header, bodies, y_ids, post, read_kwargs, pre) if len(indices) > 1 else None
+            if post_values is None:
+                return
+            for i, values in zip(indices, post_values):
+                record.add_file(files[i])
+                results[i] = values
+
+        for i, file in enumerate(files):
+            if not is_csv(file) or is_streamed(file, chunksize):
+                continue
+            with open(file, "rb") as data_file:
+                header, _, body = data_file.read().partition(b"\n")
+            body = body.rstrip(b"\r\n")
+            # lines are rows unless a quoted value holds a new line
+            if not body or b'"' in body:
+                continue
+            batch = pending.setdefault(header, [[], [], 0])
+            batch[0].append(i)
+            batch[1].append(body + b"\n")
+            batch[2] += len(body) + 1
+            if batch[2] >= point_batch_bytes:
+                parse(header)
+        for header in list(pending):
+            parse(header)
+    return results
+
+
+def _parse_point_batch(header, bodies, y_ids, post, read_kwargs, pre):
+    # the aggregates of each body, None if they aren't the same as when each file is loaded on its own
+    lengths = np.array([body.count(b"\n") for body in bodies])
+    try:
+        df = pd.read_csv(io.BytesIO(b"".join([header, b"\n"] + list(bodies))), **read_kwargs)
+        if len(df) != lengths.sum():  # e.g. blank lines were skipped
+            return None
+        df.columns = df.columns.str.strip()
+        # the index is which file a row is from, so the rows pre-processing keeps can be counted per file
+        df.index = np.repeat(np.arange(len(bodies)), lengths)
+        df = preprocessing(df, pre)
+    except Exception:
+        # the files are loaded one by one to raise the error for the file it's in
+        return None
+    lengths = np.bincount(df.index.to_numpy(), minlength=len(bodies))
+    if lengths.min() == 0 or any(y_id not in df.columns or df[y_id].dtype.kind not in 'iuf' for y_id in y_ids):
+        return None
+    aggregates = {y_id: reduce_groups(df[y_id].to_numpy(), lengths, post) for y_id in y_ids}
+    return [{y_id: aggregates[y_id][j] for y_id in y_ids} for j in range(len(bodies))]
+
+
+def _apply_row_mask(df, keep):
+    if keep is None:
+        return df
+    return df.loc[keep]
+
+
+def load_file(file, read_kwargs={}, pre=[], read_cache=None):
+    """
+    read a data file, strip the white space from its column headers and pre-process it
+
+    Parameters
+    ----------
+    file: str or Path
+        data file to load
+    read_kwargs: dict
+        key word arguments passed to read()
+    pre: list
+        pre-processing steps
+    read_cache: ReadCache
+        cache of parsed data files, None to always parse the file
+
+    Returns
+    -------
+    DataFrame
+    """
+    with profiling.stage("load/read") as record:
+        record.add_file(file)
+        if read_cache is not None:
+            df = read_cache.read(file, **read_kwargs)
+        else:
+            df = read(file, **read_kwargs)
+
+    # strip only beginning and ending white space from column headers
+    df.columns = df.columns.str.strip()
+
+    with profiling.stage("load/preprocessing"):
+        return preprocessing(df, pre)
+
+
+def load_post_values(file, y_ids=[], post='avg', read_kwargs={}, pre=[], chunksize=100000, read_cache=None):
+    """
+    compute the post-processing aggregate of each y_id column while reading the file in chunks so peak memory
+    doesn't depend on the size of the file
+
+    Parameters
+    ----------
+    file: str or Path
+        data file to load
+    y_ids: list
+        columns to aggregate
+    post: str
+        'avg', 'max' or 'min'
+    read_kwargs: dict
+        key word arguments passed to read_chunks()
+    pre: list
+        pre-processing steps, applied to each chunk
+    chunksize: int
+        number of rows per chunk
+    read_cache: ReadCache
+        cache of the aggregates, None to always read the file
+
+    Returns
+    -------
+    dict
+        {y_id: aggregate}
+    """
+    def compute():
+        # partial results of each chunk, combined once the whole file has been read
+        partials = {y_id: [] for y_id in y_ids}
+        counts = []
+        for chunk in read_chunks(file, chunksize=chunksize, **read_kwargs):
+            chunk.columns = chunk.columns.str.strip()
+            chunk = preprocessing(chunk, pre)  # all steps are row by row so can be applied per chunk
+            counts.append(len(chunk))
+            for y_id in y_ids:
+                values = chunk[y_id].to_numpy()
+                if post == 'avg':
+                    partials[y_id].append(np.sum(values))
+                elif len(values) > 0:
+                    partials[y_id].append(post_reductions[post](values))
+
+        post_values = {}
+        for y_id in y_ids:
+            if post == 'avg':
+                post_values[y_id] = np.sum(partials[y_id]) / np.sum(counts)
+            else:
+                # like np.max/np.min of the whole column this raises if there are no values
+                post_values[y_id] = post_reductions[post](np.array(partials[y_id]))
+        return post_values
+
+    with profiling.stage("load/read") as record:
+        record.add_file(file)
+        if read_cache is not None:
+            key_kwargs = dict(read_kwargs, y_ids=y_ids, post=post, pre=pre)
+            return read_cache.get(file, key_kwargs, compute)
+        return compute()
+
+
+def _try_load_point(file, y_ids=[], post='avg', read_kwargs={}, pre=[], chunksize=100000, read_cache=None):
+    # files read_chunks() reads in one go are returned whole so their aggregates are computed together with the
+    # folder's other files held in memory, larger files are streamed and their aggregates returned
+    # errors are raised when the folder's y values are processed, the same as for loaded files
+    try:
+        if not is_streamed(file, chunksize):
+            return load_file(file, read_kwargs=read_kwargs, pre=pre, read_cache=read_cache)
+        return load_post_values(file, y_ids=y_ids, post=post, read_kwargs=read_kwargs, pre=pre, chunksize=chunksize,
+                                read_cache=read_cache)
+    except Exception as e:
+        return e
 
 
 class Folder(object):
-    def __init__(self, directory, x_id='', y_id='', args_dict={}):
+    """
+    the data files of one directory loaded as x and y values
+
+    Parameters
+    ----------
+    directory: str or Path
+        directory containing the data files
+    x_id: str
+        x column, 'index' or what to extract the x value from the file names with
+    y_id: str or list
+        y column(s) or 'headers' for all
+    args_dict: PlotConfig or dict
+        plot settings
+    state: PlotState
+        shared by the folders of a plot, a new one is used if None
+    """
+    def __init__(self, directory, x_id='', y_id='', args_dict={}, state=None):
 
-        self.args_dict = args_dict
+        self.config = config = as_plot_config(args_dict)
+        self.state = state if state is not None else PlotState()
         self.x_id = x_id
         self.y_id = y_id
-        self.pre = args_dict.get('pre', [])
-        self.post = args_dict.get('post')
+        self.pre = config.pre
+        self.post = config.post
         self.name = Path(directory).name
 
-        self.x = []  # list of dicts
-        self.y = []  # list of dicts
+        self.x = []  # list of dicts of numpy arrays
+        self.y = []  # list of lists of dicts of numpy arrays
 
         self.empty = True
 
-        self.schema = schema = args_dict.get('schema', {})
-        include_filter = schema.get('file_include_filter')
-        exclude_filter = schema.get('file_exclude_filter')
-        header = schema.get('header', 'infer')
-        x_id_in_file_name = schema.get('x_id_in_file_name', False)
-        x_id_is_reg_exp = schema.get('x_id_is_reg_exp', False)
-        index_col = schema.get('index_col')
-        file_extensions = schema.get('file_extension', ['csv', 'xlsx', 'xls'])
-        if isinstance(file_extensions, str):
-            file_extensions = [file_extensions]
-        data_files = []
-        for file_extension in file_extensions:
-            # TODO rename file_extension or split into 2 variables
-            match_string = str(Path(f"*{file_extension}"))
-            ext_data = list(Path(directory).glob(match_string))
-            data_files.extend(ext_data)
-            logging.debug(f"{directory}'s match_string: {match_string}")
-        logging.debug(f"{directory}'s data_files: {data_files}")
+        header = config.header
+        x_id_in_file_name = config.x_id_in_file_name
+        x_id_is_reg_exp = config.x_id_is_reg_exp
+        index_col = config.index_col
+        read_cache = config.read_cache
+        files = select_data_files(directory, config, config.dir_index)
         self.dataframes = []
         self.file_infos = []
-        if len(data_files) > 0:
-            for file in data_files:  # read in all the dfs
+        if len(files) > 0:
+            # read in all the dfs, map keeps the file order so trace order and marker symbols are stable
+            x_from_name = x_id_in_file_name or x_id_is_reg_exp
+            read_kwargs = self._read_kwargs(index_col, header, x_from_name)
+            # the point aggregates of files too large to read in one go are computed while streaming through them
+            stream_post = x_from_name and self.post in post_functions and self.y_id != 'headers'
+            if stream_post:
+                y_ids = [self.y_id] if isinstance(self.y_id, str) else list(self.y_id)
+                loader = partial(_try_load_point, y_ids=y_ids, post=self.post, read_kwargs=read_kwargs,
+                                 pre=self.pre, chunksize=config.chunksize,
+                                 read_cache=read_cache)
+            else:
+                loader = partial(load_file, read_kwargs=read_kwargs, pre=self.pre, read_cache=read_cache)
+            # plots whose folders overlap share the data loaded during the run
+            # the memo keeps whole DataFrames alive, which is what low_memory avoids, a memory_budget implies it
+            low_memory = config.low_memory or config.memory_budget is not None
+            folder_memo = config.folder_memo if not low_memory else None
+            loaded = None
+            if folder_memo is not None:
+                selector = None if stream_post else read_kwargs.get('usecols')
+                memo_settings = repr([sorted((key, value) for key, value in read_kwargs.items() if key != 'usecols'),
+                                      self.pre, loader.keywords.get('y_ids'), stream_post and self.post])
+                loaded = folder_memo.get(directory, files, memo_settings, selector)
+            if loaded is None:
+                loaded = [None] * len(files)
+                if stream_post:
+                    # small files are parsed together, the ones that can't be are loaded one by one
+                    loaded = load_point_batches(files, y_ids, self.post, read_kwargs, self.pre, config.chunksize)
+                remaining = [i for i, values in enumerate(loaded) if values is None]
+                remaining_files = [files[i] for i in remaining]
+                load_workers = config.load_workers
+                if load_workers > 1 and len(remaining_files) > 1:
+                    if config.load_executor == 'process':
+                        executor_class = ProcessPoolExecutor
+                    else:
+                        executor_class = ThreadPoolExecutor
+                    with executor_class(max_workers=load_workers) as executor:
+                        remaining_loaded = list(executor.map(loader, remaining_files))
+                else:
+                    remaining_loaded = list(map(loader, remaining_files))
+                for i, df in zip(remaining, remaining_loaded):
+                    loaded[i] = df
+                if folder_memo is not None:
+                    folder_memo.put(directory, files, memo_settings, selector, loaded)
+
+            # the x values of all file names are extracted at once
+            x_values = self._retrieve_x_from_names(files) if x_from_name else None
+            debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+            for i, (file, df) in enumerate(zip(files, loaded)):
                 file_path = Path(file)
-                file_name = file_path.name
-                if include_filter and not check_filter_match(include_filter, file_name):
-                    logging.info(f"ignoring {file} because it does not match file_include_filter")
-                    continue
-                if exclude_filter and check_filter_match(exclude_filter, file_name):
-                    logging.info(f"ignoring {file} because it matches file_exclude_filter")
-                    continue
                 file_info = {'file_stem' : file_path.stem,
                              'file_path': str(file_path)}
-                df = read(file, index_col=index_col, header=header)
+                if stream_post and not isinstance(df, pd.DataFrame):
+                    file_info['post_values'] = df
+                    df = None  # the file was never held in memory
 
-                # strip only beginning and ending white space from column headers
-                df.columns = df.columns.str.strip()
-                
                 # if x_id or y_id not a columns header, try to fuzzy match it
                 # if matching doesn't work then skip the file
                 # TODO fix before commenting in, currently breaks tests
@@ -174,19 +490,26 @@ class Folder(object):
                 # only set folder as not empty if there is plotable data
                 self.empty = False
                 
-                if x_id_in_file_name or x_id_is_reg_exp:  # if true the df_type is point
-                    file_info['x_value'] = self._retrieve_x_from_name(file)
+                if x_values is not None:  # the df_type is point
+                    file_info['x_value'] = x_values[i]
                 file_info['df_type'] = self._determine_df_type(df, file_info)
-                df = preprocessing(df, self.pre)
                 self.dataframes.append(df)
                 self.file_infos.append(file_info)
-                logging.debug(f"{file}: info: {file_info} headers: {df.columns} "
-                            f"data: {df}")
+                if not debug:
+                    # formatting the DataFrame takes longer than loading a small file
+                    continue
+                if df is not None:
+                    logging.debug(f"{file}: info: {file_info} headers: {df.columns} "
+                                f"data: {df}")
+                else:
+                    logging.debug(f"{file}: info: {file_info}")
 
             # handle folder data errors
             try:
                 self._x_values()
                 self._y_values()
+                if low_memory:
+                    self._compact()
             except Exception as e:
                 logging.error(e, exc_info=True)
                 logging.error(f"Above error processing folder {directory}")
@@ -195,32 +518,77 @@ class Folder(object):
         else:
             logging.debug(f"no data files found in {directory}")
 
-    def _retrieve_x_from_name(self, filename):
+    def _compact(self):
+        # x and y values are views of the DataFrames' data, copies of only the plotted columns let the DataFrames go
+        float32 = self.config.float32
+        for values in self.x:
+            for key in values:
+                values[key] = compact_array(values[key], float32)
+        for traces in self.y:
+            for trace in traces:
+                for key in trace:
+                    trace[key] = compact_array(trace[key], float32)
+        self.dataframes = [None] * len(self.dataframes)
+
+    def _read_kwargs(self, index_col, header, x_from_name):
+        read_kwargs = {'index_col': index_col, 'header': header}
+        if index_col is not None:
+            return read_kwargs
+
+        # only read the plotted columns when they are known before the file is read, pre-processing steps that
+        # remove rows look at every column so they need the full file
+        filters_rows = any(step in row_filter_steps for step in self.pre)
+        if self.y_id != 'headers' and not isinstance(header, list) and not filters_rows:
+            columns = [self.y_id] if isinstance(self.y_id, str) else list(self.y_id)
+            # x_id is not a column when the x value comes from the file name
+            if not x_from_name and self.x_id != 'index':
+                columns.append(self.x_id)
+            read_kwargs['usecols'] = ColumnSelector(columns)
+
+        # converting to float first gives the same result as parsing as float
+        if self.pre[:1] == ['convert_to_float']:
+            read_kwargs['dtype'] = float
+
+        return read_kwargs
+
+    def _retrieve_x_from_names(self, files):
+        """
+        the x value in each file name, None where the x_id regular expression doesn't match
+        """
         x_id = self.x_id
-        x_time_format = self.schema.get('x_time_format', None)
+        x_time_format = self.config.x_time_format
 
-        if self.schema.get('x_id_is_reg_exp', False):
-            # x_id contains regular expression, use it to find 
+        stems = [Path(file).stem for file in files]
+        if self.config.x_id_is_reg_exp:
+            # x_id contains regular expression, use it to find
             # example x_id: "_(\\d+)N"
-            extracted = re.search(x_id, Path(filename).stem)
-            if extracted:
-                extracted = extracted.group(1)
-            else:
-                logging.warning(f"x_id '{x_id}' not found in filename '{filename}'")
-                return None
+            pattern = re.compile(x_id)
+            extracted = []
+            for file, stem in zip(files, stems):
+                match = pattern.search(stem)
+                if match:
+                    extracted.append(match.group(1))
+                else:
+                    logging.warning(f"x_id '{x_id}' not found in filename '{file}'")
+                    extracted.append(None)
         else:
-            extracted = Path(filename).stem.split(x_id)[1].split(x_id)[0]
+            extracted = [stem.split(x_id)[1].split(x_id)[0] for stem in stems]
 
+        found = [i for i, value in enumerate(extracted) if value is not None]
+        x_values = [None] * len(files)
+        if not found:
+            return x_values
         if x_time_format is not None:
-            time_stamp = datetime.strptime(extracted, x_time_format).timestamp()
-            if self.args_dict.get('min_timestamp') is None:
-                self.args_dict['min_timestamp'] = time_stamp
-                x_value = 0
-            else:
-                x_value = time_stamp - self.args_dict['min_timestamp']
+            time_stamps = parse_time_stamps([extracted[i] for i in found], x_time_format)
+            # relative to the first file of the plot
+            if self.state.min_timestamp is None:
+                self.state.min_timestamp = time_stamps[0]
+            values = time_stamps - self.state.min_timestamp
         else:
-            x_value = float(extracted)
-        return x_value
+            values = [float(extracted[i]) for i in found]
+        for i, value in zip(found, values):
+            x_values[i] = value
+        return x_values
 
     def _determine_df_type(self, df, file_info):
 
@@ -254,14 +622,15 @@ class Folder(object):
             if x_value is not None:
                 x_values.append(x_value)
             else:
+                # to_numpy returns a view of the DataFrame's data where possible
                 if self.x_id == 'index':
-                    values = dfs[i].index.to_list()
+                    values = dfs[i].index.to_numpy()
                 else:
-                    values = dfs[i][x_id].to_list()
+                    values = dfs[i][x_id].to_numpy()
                 self.x.append({self.x_id: values})
 
         if len(x_values) > 0:
-            self.x.append({self.x_id: x_values})
+            self.x.append({self.x_id: np.asarray(x_values)})
 
     def _y_values(self):
 
@@ -278,24 +647,33 @@ class Folder(object):
 
         y_values = []
 
+        # the aggregates of the files held in memory are computed for all of them at once
+        aggregates = {}
+        in_memory = [i for i, info in enumerate(self.file_infos)
+                     if info['df_type'] == 'point' and 'post_values' not in info]
+        if post in post_functions and in_memory:
+            for column in y_ids:
+                column_values = post_values_of([dfs[i] for i in in_memory], column, post)
+                aggregates.update(((i, column), value) for i, value in zip(in_memory, column_values))
+
         for i, info in enumerate(self.file_infos):
             if info['df_type'] == 'point':
                 for y_id in y_ids:
                     # TODO implement more post process
-                    if 'avg' == post:
-                        y_values.append(np.average(dfs[i][y_id]))
-                    elif 'max' == post:
-                        y_values.append(np.max(dfs[i][y_id]))
-                    elif 'min' == post:
-                        y_values.append(np.min(dfs[i][y_id]))
+                    if 'post_values' in info:
+                        if isinstance(info['post_values'], Exception):
+                            raise info['post_values']
+                        y_values.append(info['post_values'][y_id])
+                    elif (i, y_id) in aggregates:
+                        y_values.append(aggregates[(i, y_id)])
                     else:
                         y_values.append(dfs[i][y_id][0])  # take the 1st value in the column
             else:
                 traces = []
                 for y_id in y_ids:
-                    points = dfs[i][y_id].to_list()
+                    points = dfs[i][y_id].to_numpy()
                     traces.append({y_id: points})
                 self.y.append(traces)
 
         if len(y_values) > 0:
-            self.y.append([{y_id: y_values}])
+            self.y.append([{y_id: np.asarray(y_values)}])
@@ -0,0 +1,87 @@
+"""
+memo.py contains the per run memo of loaded folder data, plots whose folders overlap, e.g. a plot_info file at the
+data_root and more in its sub directories, load each folder's files once per run
+"""
+import logging
+import os
+from collections import Counter
+
+from plotme.read import project
+
+
+def _key(directory):
+    return os.path.normpath(str(directory))
+
+
+class FolderMemo(object):
+    """
+    Data loaded by Folder, kept while plots that are still to come will load the same directory.
+
+    Entries are keyed by directory, data files and the read settings that change the loaded data (header, index_col,
+    pre, post, ...). A plot reading fewer columns reuses an entry that holds them all.
+
+    Parameters
+    ----------
+    references: Counter
+        {directory: number of times the plots still to come load it}
+    """
+
+    def __init__(self, references=None):
+        self.references = Counter(references or {})
+        self.entries = {}  # {(directory, files, settings): (columns, loaded)}
+        self.hits = 0
+
+    def add_plot(self, folders):
+        """
+        count the directories a plot will load
+        """
+        self.references.update(_key(folder) for folder in folders)
+
+    def release(self, folders):
+        """
+        a plot is done with folders, the data of directories no other plot will load is dropped
+        """
+        for folder in folders:
+            directory = _key(folder)
+            self.references[directory] -= 1
+            if self.references[directory] <= 0:
+                del self.references[directory]
+                for key in [key for key in self.entries if key[0] == directory]:
+                    del self.entries[key]
+
+    def get(self, directory, files, settings, selector=None):
+        """
+        the loaded data of files, projected to the columns selector selects, None if it wasn't memoized
+
+        Parameters
+        ----------
+        directory: str or Path
+            folder the files are in
+        files: list
+            data files, in load order
+        settings: str
+            the read settings, except usecols
+        selector: ColumnSelector
+            columns to return, all if None
+        """
+        entry = self.entries.get((_key(directory), tuple(str(file) for file in files), settings))
+        if entry is None:
+            return None
+        columns, loaded = entry
+        if columns is not None:
+            if selector is None or not selector.columns <= columns:
+                return None
+        self.hits += 1
+        logging.debug(f"reusing the data loaded from {directory}")
+        if selector is None or columns == selector.columns:
+            return loaded
+        return [project(df, selector) for df in loaded]
+
+    def put(self, directory, files, settings, selector, loaded):
+        """
+        keep loaded if another plot, or the same plot, will load directory again
+        """
+        if self.references[_key(directory)] <= 1:
+            return
+        columns = selector.columns if selector is not None else None
+        self.entries[(_key(directory), tuple(str(file) for file in files), settings)] = (columns, loaded)
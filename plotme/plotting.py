@@ -1,21 +1,35 @@
-import glob
+import hashlib
 import json
 import logging
 import os
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatch
 from pathlib import Path
 
-import plotly.graph_objects as go
-import plotly.io as pio
-from dirhash import dirhash
-from jsonschema import validate
-from plotly.subplots import make_subplots
-
-from plotme.helper import strip_white_space
-from plotme.load_data import Folder, check_filter_match
-from plotme.schema import schema, template
+# plotly, pandas, numpy and jsonschema are imported where they are used, a run where every plot is
+# unchanged only needs the standard library
+from plotme import profiling
+from plotme.cache import ReadCache, default_cache_size
+from plotme.config import PlotConfig, PlotState, as_plot_config, load_plot_info
+from plotme.export import ImageBatch, image_formats, requested_image_formats
+from plotme.hashing import load_manifest, save_manifest, stat_files_hash
+from plotme.index import DirIndex
+from plotme.memo import FolderMemo
+from plotme.read import is_csv
+from plotme.schema import template
+from plotme.selection import plot_dependencies, plot_folders, select_folders
 
 template_file_name = "must_rename_template_plot_info.json"
 plot_info_id = "plot_info"
+default_decimate_points = 5000
+plotlyjs_file_name = "plotly.min.js"
+plotlyjs_marker_name = f"{plotlyjs_file_name}.version"  # plotly version and md5 of the bundle next to it
+plotlyjs_modes = ["cdn", "directory", "inline"]
+# files created by plotme, changes to these don't trigger regeneration
+hash_ignore = ["*previous_hash", "*previous_manifest.json", "*.html", "*.log", f"*{profiling.report_file_name}",
+               plotlyjs_file_name, plotlyjs_marker_name] + [f"*.{image_format}" for image_format in image_formats]
+
+_plotlyjs_checked = set()  # bundles already checked by this process
 
 def plot_all(args_dict={}):
     """
@@ -32,7 +46,10 @@ def plot_all(args_dict={}):
     plot_info_file = args_dict.get('plot_info_file', plot_info_id)
 
     data_root = Path(args_dict.get('data_root', os.getcwd()))
-    plot_info_files = list(data_root.glob(f"**/*{plot_info_file}.json"))
+    # the tree is scanned once, every later stage looks up directories and files in the index
+    with profiling.stage("discovery"):
+        dir_index = DirIndex(data_root)
+        plot_info_files = dir_index.find_files(f"*{plot_info_file}.json")
 
     # save template plot_info.json
     if len(plot_info_files) == 0 or args_dict.get('template'):
@@ -42,17 +59,179 @@ def plot_all(args_dict={}):
             logging.info("template plot_info file generated")
             return 0
 
-    for file in plot_info_files:
-        dir_path = file.parent
+    if args_dict.get('clear_cache'):
+        ReadCache().clear()
 
-        # skip template_plot_info.json files
-        if template_file_name in str(file):
-            logging.info(f"ignoring {file} because the name matches the template file name")
-            continue
+    plot_info_files = [file for file in plot_info_files if not _is_template(file)]
+    return plot_files(plot_info_files, args_dict, dir_index)
+
+
+def plot_files(plot_info_files, args_dict={}, dir_index=None):
+    """
+    runs process_plot_info for each plot_info file, in parallel if args_dict['jobs'] > 1
+
+    Parameters
+    ----------
+    plot_info_files: list
+        plot_info files to process
+    args_dict: dictionary
+        input arguments
+    dir_index: DirIndex
+        index of a directory tree containing all plot_info_files, each plot_info file's folder is scanned if None
 
-        # hashing folder recursively
-        current_hash = dirhash(dir_path, "md5", ignore=["*previous_hash", "*.html", "*.png", "*.log"])
-        hash_file_path = Path(dir_path, f"{file.stem}_previous_hash")
+    """
+    read_cache = None
+    if args_dict.get('cache', True):
+        read_cache = ReadCache(max_size=args_dict.get('cache_size', default_cache_size),
+                               incremental=args_dict.get('incremental', False))
+    image_batch = None
+    if requested_image_formats(args_dict):
+        image_batch = ImageBatch()
+
+    failures = []
+    unsaved = []  # results whose hashes are saved once their images are exported
+    jobs = args_dict.get('jobs', 1)
+    if jobs > 1 and len(plot_info_files) > 1:
+        logging.info(f"plotting {len(plot_info_files)} plot_info files with {jobs} jobs")
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_job_logging,
+                                 initargs=(logging.getLogger().level,)) as executor:
+            profiler = profiling.active()
+            futures = []
+            for file in plot_info_files:
+                job_index = dir_index.subtree(file.parent) if dir_index is not None else None
+                futures.append(executor.submit(_plot_info_job, file, args_dict, read_cache, job_index,
+                                               profiler is not None))
+            # handle results in submission order so the logs and hash files are written deterministically
+            for file, future in zip(plot_info_files, futures):
+                try:
+                    result, records = future.result()
+                except Exception as e:  # the worker process died
+                    failures.append((file, repr(e)))
+                    continue
+                for record in records:
+                    logging.getLogger().handle(record)
+                if 'profile' in result and profiler is not None:
+                    profiler.merge(result.pop('profile'))
+                if 'error' in result:
+                    failures.append((file, result['error']))
+                    continue
+                if 'images' in result:
+                    image_batch.extend(result.pop('images'))
+                unsaved.append(result)
+                if image_batch is None or image_batch.full():
+                    _export_and_save(image_batch, unsaved)
+    else:
+        folder_memo = None
+        if dir_index is not None:
+            # the data of folders shared by several plot_info files is kept until the last of them is done
+            folder_memo = FolderMemo()
+            for file in plot_info_files:
+                folder_memo.add_plot(plot_folders(file.parent, dir_index))
+        for file in plot_info_files:
+            unsaved.append(process_plot_info(file, args_dict, read_cache, dir_index, image_batch, folder_memo))
+            if folder_memo is not None:
+                folder_memo.release(plot_folders(file.parent, dir_index))
+            if image_batch is None or image_batch.full():
+                _export_and_save(image_batch, unsaved)
+        if folder_memo is not None and folder_memo.hits:
+            logging.info(f"reused already loaded data for {folder_memo.hits} folders")
+    _export_and_save(image_batch, unsaved)
+
+    if read_cache is not None:
+        read_cache.prune()
+
+    if failures:
+        for file, error in failures:
+            logging.error(f"failed to plot {file}: {error}")
+        raise RuntimeError(f"{len(failures)} of {len(plot_info_files)} plot_info files failed")
+
+    return 0
+
+
+def _is_template(file):
+    # skip template_plot_info.json files
+    if template_file_name in str(file):
+        logging.info(f"ignoring {file} because the name matches the template file name")
+        return True
+    return False
+
+
+def process_plot_info(file, args_dict={}, read_cache=None, dir_index=None, image_batch=None, folder_memo=None):
+    """
+    checks previous hash against current hash of a plot_info file's folder and runs single_plot if they differ
+
+    Parameters
+    ----------
+    file: Path
+        plot_info file
+    args_dict: dictionary
+        input arguments
+    read_cache: ReadCache
+        cache of parsed data files, None to disable
+    dir_index: DirIndex
+        index of the directory tree containing file, it is scanned if None
+    image_batch: ImageBatch
+        collects the plot's images to export, they are exported right away if None
+    folder_memo: FolderMemo
+        data loaded by earlier plots of the run, None to always load
+
+    Returns
+    -------
+    dict
+        hash and manifest to save once the plot has been generated
+    """
+    dir_path = file.parent
+    if dir_index is None:
+        dir_index = DirIndex(dir_path)
+    result = {'hash_file_path': Path(dir_path, f"{file.stem}_previous_hash"),
+              'current_hash': None,
+              'manifest_path': Path(dir_path, f"{file.stem}_previous_manifest.json"),
+              'manifest': None}
+
+    with profiling.plot_info(file):
+        # the plot only depends on its plot_info file and the data files it reads, other files in the folder don't
+        # trigger regeneration
+        with profiling.stage("hash") as record:
+            plot_info = load_plot_info(file, validate=False)
+            try:
+                plot_info['plot_dir'] = dir_path
+                plot_info['plot_info_file'] = file
+                args_and_plot_info = args_dict.copy()
+                args_and_plot_info.update(plot_info)  # plot_info can overwrite args
+                args_and_plot_info['read_cache'] = read_cache
+                args_and_plot_info['dir_index'] = dir_index
+                args_and_plot_info['image_batch'] = image_batch
+                args_and_plot_info['folder_memo'] = folder_memo
+                config = PlotConfig(args_and_plot_info)
+                dependencies = [dependency for dependency in plot_dependencies(config, dir_index)
+                                if not any(fnmatch(dependency.name, pattern) for pattern in hash_ignore)]
+            except Exception:
+                # the plot_info file hasn't been validated yet, report what is wrong with it rather than where the
+                # invalid settings broke
+                load_plot_info(file)
+                raise
+
+            previous_manifest = load_manifest(result['manifest_path'])
+            # logs parsed with --incremental only have what was appended to them hashed
+            appended = is_csv if args_dict.get('incremental') else None
+            if args_dict.get('strict_hash'):
+                # read every file instead of trusting unchanged size, mtime and inode
+                current_hash, manifest = stat_files_hash(dir_path, dependencies, None, dir_index)
+            else:
+                current_hash, manifest = stat_files_hash(dir_path, dependencies, previous_manifest, dir_index,
+                                                         appended)
+            if manifest != previous_manifest:
+                result['manifest'] = manifest
+            if record.counting:
+                for rel_path, entry in manifest.items():
+                    previous = previous_manifest.get(rel_path)
+                    if args_dict.get('strict_hash') or not previous or previous[3] is None:
+                        record.add_file(n_bytes=entry[0])
+                    elif previous[:3] != entry[:3]:
+                        grew = appended is not None and appended(rel_path) and previous[2] == entry[2] \
+                            and previous[0] < entry[0]
+                        record.add_file(n_bytes=entry[0] - previous[0] if grew else entry[0])
+        hash_file_path = result['hash_file_path']
         if hash_file_path.exists():
             with open(hash_file_path) as txt_file:
                 previous_hash = txt_file.read()
@@ -61,167 +240,363 @@ def plot_all(args_dict={}):
 
         force = args_dict.get('force')
         if current_hash == previous_hash and not force:
-            # only skips entire folder, if multiple plot_info files all must be unchanged to skip
             logging.info(f"no changes detected, skipping {file}")
         else:
             logging.info(f'loading plot settings from {file}')
-            with open(file) as json_file:
-                plot_info = json.load(json_file)
-            validate(instance=plot_info, schema=schema)
-            plot_info['plot_dir'] = dir_path
-            plot_info['plot_info_file'] = file
-            args_and_plot_info = args_dict.copy()
-            args_and_plot_info.update(plot_info)
-            not_a_plot = args_and_plot_info.get('not_a_plot', False)
-            if not_a_plot is False:
-                single_plot(args_and_plot_info)  # plot_info can overwrite args
-                with open(hash_file_path, "w+") as txt_file:
-                    txt_file.write(current_hash)
+            with profiling.stage("validate"):
+                load_plot_info(file)  # raises if the settings are invalid
+            if config.not_a_plot is False:
+                single_plot(config)
+                result['current_hash'] = current_hash
 
-    return 0
+    return result
 
 
-def single_plot(args_dict={}):
-    plot_dir = args_dict.get('plot_dir', Path.home())
-    pio_template = args_dict.get('pio.template', "plotly_white")
-    height = args_dict.get('height', 600)
-    width = args_dict.get('width', 1000)
-
-    title = args_dict.get('title_text', 'plotme plot')
-    x_id = args_dict.get('x_id', 'index')
-    x_id = strip_white_space(x_id)
-    x_title = args_dict.get('x_title', x_id)  # use x_id if no label is given
-    y_id = args_dict.get('y_id', 'headers')
-    y_id = strip_white_space(y_id)
-    y_title = args_dict.get('y_title', y_id)  # use y_id if no label is given
-    trace_mode = args_dict.get('trace_mode', 'markers')
-    marker_symbols = args_dict.get('marker_symbols')
-    update_traces_kwargs = args_dict.get('update_traces_kwargs', {})
-    show_legend = args_dict.get('showlegend', True)
-    update_layout_kwargs = args_dict.get('update_layout_kwargs', {})
-    x_axes_kwargs = args_dict.get('x_axes_kwargs', {})
-    y_axes_kwargs = args_dict.get('y_axes_kwargs', {})
-    x_axes_visible = args_dict.get('xaxes_visible', True)
-    y_axes_visible = args_dict.get('yaxes_visible', True)
-    include_filter = args_dict.get('folder_include_filter')
-    exclude_filter = args_dict.get('folder_exclude_filter')
-
-    trace_label = args_dict.get("schema", {}).get("trace_label", "file_name")
-    remove_from_trace_label = args_dict.get("schema", {}).get("remove_from_trace_label", "")
-    constant_lines = args_dict.get('constant_lines', {})
-    constant_lines_x = constant_lines.get('x=', [])  # list
-    constant_lines_y = constant_lines.get('y=', [])  # list
-    error_y = args_dict.get('error_y', {})
-    if error_y:
-        if not error_y.get('visible'):
-            error_y['visible'] = True
-
-    folders = glob.glob(f"{plot_dir}/**/", recursive=True)
-    folders.append(plot_dir)  # include the data_root directory
-
-    # Add only the folders that the filters allow
-    folder_datas = []
-    for folder in folders:
-        directory = Path(folder)
-        if directory.name == 'ignore':
-            logging.info(f"ignoring {directory} because named 'ignore'")
-            continue
-        if include_filter and not check_filter_match(include_filter, directory.name):
-            logging.info(f"ignoring {directory} because it does not match folder_include_filter")
-            continue
-        if exclude_filter and check_filter_match(exclude_filter, directory.name):
-            logging.info(f"ignoring {directory} because it does match folder_exclude_filter")
-            continue
-        folder_data = Folder(directory, x_id, y_id, args_dict)
-        if folder_data.empty:
-            continue
-        folder_datas.append(folder_data)
+def _save_hashes(result):
+    if result['manifest'] is not None:
+        save_manifest(result['manifest_path'], result['manifest'])
+    if result['current_hash'] is not None:
+        with open(result['hash_file_path'], "w+") as txt_file:
+            txt_file.write(result['current_hash'])
 
-    # determine plot_source, plot_source used if df_type is 'trace' or 'point'
-    n_folder_datas = len(folder_datas)
-    logging.debug(f"n_folder_datas: {n_folder_datas}")
-
-    x_dict = {}
-    y_dict = {}
-    for folder_data in folder_datas:
-        x = folder_data.x
-        y = folder_data.y
-        file_infos = folder_data.file_infos
-
-        # assume all df_type in a folder are the same
-        df_type = file_infos[0]['df_type']
-
-        trace_x_id = list(x[0].keys())[0]
-        # build the dicts to plot
-        # debugging prints
-        # print(f"len_y: {len(y)}")
-        # print(f"len_x: {len(x)}")
-        # print(f"len(x[0][trace_x_id]): {len(x[0][trace_x_id])}")
-        for i, traces in enumerate(y):
-            # this section of the code finds a unique trace_id for each trace
-            # the y data contains trace_y_id and for some cases the trace_id
-            num_traces = len(traces)
-            
-            #overwrite df_type because it is actually a plot
-            if num_traces == 1 and n_folder_datas == 1 and len(y) == 1:
-                df_type = 'plot'
-            
-            for trace in traces:
-                trace_y_id = list(trace.keys())[0]
-                match df_type:
-                    case 'plot':
-                        trace_id = trace_y_id
-                    case 'trace':
-                        if trace_label == 'file_name':
-                            trace_id = file_infos[i]['file_stem']
-                        elif trace_label == 'folder_name':
-                            trace_id = folder_data.name
-                        else:
-                            raise ValueError (f"Unexpected trace_label: {trace_label}, options are file_name or folder_name")
-                    case 'point':
-                        trace_id = folder_data.name
-                    case _:
-                        logging.error(f"Unexpected df_type: {df_type}")
 
-                trace_id = trace_id.replace(remove_from_trace_label, "")
-                y_dict.update({trace_id: trace[trace_y_id]})
-                x_dict.update({trace_id: x[i][trace_x_id]})
+class _RecordCollector(logging.Handler):
+    """
+    collects a job's log records so they can be emitted by the main process in one block
+    """
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        # make the record picklable for the trip back to the main process
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+
+def _init_job_logging(log_level):
+    log = logging.getLogger()
+    log.handlers = []
+    log.setLevel(log_level)
+
+
+def _export_and_save(image_batch, unsaved):
+    # hashes are only saved once the plot's images exist so a failed export is retried on the next run
+    if image_batch is not None:
+        image_batch.flush()
+    for result in unsaved:
+        _save_hashes(result)
+    unsaved.clear()
+
+
+def _plot_info_job(file, args_dict, read_cache, dir_index, profile=False):
+    log = logging.getLogger()
+    collector = _RecordCollector()
+    log.addHandler(collector)
+    if profile:
+        profiling.start()
+    try:
+        # the images are exported by the main process together with those of the other jobs
+        image_batch = ImageBatch() if requested_image_formats(args_dict) else None
+        result = process_plot_info(file, args_dict, read_cache, dir_index, image_batch)
+        if image_batch is not None:
+            result['images'] = image_batch.entries()
+    except Exception as e:
+        logging.exception(f"error plotting {file}")
+        result = {'error': f"{type(e).__name__}: {e}"}
+    finally:
+        log.removeHandler(collector)
+        if profile:
+            # the stages are merged into the main process' profile
+            result['profile'] = profiling.stop()['plot_info_files']
+    return result, collector.records
 
-    pio.templates.default = pio_template
-    fig = make_subplots(rows=1, cols=1, shared_yaxes=True,
-                        x_title=x_title, y_title=y_title)
 
+def single_plot(args_dict={}):
+    import plotly.io as pio
+
+    config = as_plot_config(args_dict)
+    plot_dir = config.plot_dir
+    x_id = config.x_id
+    y_id = config.y_id
+    marker_symbols = config.marker_symbols
+    constant_lines_x = config.constant_lines.get('x=', [])  # list
+    constant_lines_y = config.constant_lines.get('y=', [])  # list
+    decimate_info = config.decimate
+    error_y = config.error_y
+    if error_y and not error_y.get('visible'):
+        error_y = dict(error_y, visible=True)
+
+    dir_index = config.dir_index
+    if dir_index is None:
+        dir_index = DirIndex(plot_dir)
+    folders = plot_folders(plot_dir, dir_index)
+
+    # folders are loaded one at a time and let go once their traces are taken, only the trace data is kept
+    x_dict = {}
+    y_dict = {}
+    budget_bytes = config.memory_budget * 1024 ** 2 if config.memory_budget else None
+    held_bytes = 0
+    over_budget = False
+    for trace_id, trace_x, trace_y in _plot_traces(select_folders(folders, config), x_id, y_id, config):
+        if trace_id in x_dict:
+            held_bytes -= _nbytes(x_dict[trace_id]) + _nbytes(y_dict[trace_id])
+        if over_budget:
+            trace_x, trace_y = _decimate_trace(trace_id, trace_x, trace_y, decimate_info)
+        y_dict.update({trace_id: trace_y})
+        x_dict.update({trace_id: trace_x})
+        held_bytes += _nbytes(trace_x) + _nbytes(trace_y)
+        if budget_bytes is not None and not over_budget and held_bytes > budget_bytes:
+            # decimating the traces held so far and all later ones keeps the plot within the budget
+            over_budget = True
+            decimate_info = dict(decimate_info or {})
+            logging.warning(f"the trace data of {config.plot_info_file} is over the memory_budget of "
+                            f"{config.memory_budget} MB, decimating every trace to "
+                            f"{decimate_info.get('n_points', default_decimate_points)} points")
+            for held_id in x_dict:
+                x_dict[held_id], y_dict[held_id] = _decimate_trace(held_id, x_dict[held_id], y_dict[held_id],
+                                                                   decimate_info)
+            held_bytes = sum(_nbytes(x_dict[held_id]) + _nbytes(y_dict[held_id]) for held_id in x_dict)
+
+    pio.templates.default = config.pio_template
+
+    # build all the traces first and create the figure from them in one go, adding traces one at a time
+    # re-validates and copies the figure's data for each trace
+    traces = []
     for i, folder in enumerate(x_dict):
         if isinstance(marker_symbols, list):
             marker_symbol = marker_symbols[i]
         else:
             marker_symbol = i % 55  # there are only 55 marker symbols in plotly
 
-        fig.add_trace(go.Scatter(name=folder, mode=trace_mode, x=x_dict[folder], y=y_dict[folder],
-                                 marker_symbol=marker_symbol, error_y=error_y), row=1, col=1)
+        trace_x = x_dict[folder]
+        trace_y = y_dict[folder]
+        if decimate_info and not over_budget:
+            trace_x, trace_y = _decimate_trace(folder, trace_x, trace_y, decimate_info)
 
-    for y_value in constant_lines_y:
-        fig.add_hline(y=y_value)
+        if config.float32:
+            trace_x = _as_float32(trace_x)
+            trace_y = _as_float32(trace_y)
 
-    for x_value in constant_lines_x:
-        fig.add_vline(x=x_value)
+        # browsers struggle to render large svg traces
+        if len(trace_y) > config.webgl_threshold:
+            trace_type = 'scattergl'
+        else:
+            trace_type = 'scatter'
+        # plain dicts are validated once when the figure is created instead of once per trace object
+        traces.append({'type': trace_type, 'name': folder, 'mode': config.trace_mode, 'x': trace_x, 'y': trace_y,
+                       'marker': {'symbol': marker_symbol}, 'error_y': error_y})
+        # raw data that was decimated can be freed
+        x_dict[folder] = y_dict[folder] = None
+
+    with profiling.stage("figure"):
+        fig = build_figure(traces, config.x_title, config.y_title)
+
+        for y_value in constant_lines_y:
+            fig.add_hline(y=y_value)
 
-    fig.update_traces(**update_traces_kwargs)
-    fig.update_layout(height=height, width=width, title_text=title)
-    fig.update_layout(showlegend=show_legend)
-    fig.update_layout(**update_layout_kwargs)
-    fig.update_xaxes(visible=x_axes_visible, **x_axes_kwargs)
-    fig.update_yaxes(visible=y_axes_visible, **y_axes_kwargs)
+        for x_value in constant_lines_x:
+            fig.add_vline(x=x_value)
+
+        fig.update_traces(**config.update_traces_kwargs)
+        fig.update_layout(height=config.height, width=config.width, title_text=config.title_text)
+        fig.update_layout(showlegend=config.showlegend)
+        fig.update_layout(**config.update_layout_kwargs)
+        fig.update_xaxes(visible=config.xaxes_visible, **config.x_axes_kwargs)
+        fig.update_yaxes(visible=config.yaxes_visible, **config.y_axes_kwargs)
 
     # file_name = f"{y_title} vs {x_title}"
     # file_name = file_name.strip()  # remove leading and trailing spaces
-    file_name = Path(args_dict['plot_info_file']).stem.replace(plot_info_id, "plot")
+    file_name = Path(config.plot_info_file).stem.replace(plot_info_id, "plot")
     file_path_no_ext = str(Path(plot_dir, f"{file_name}"))
     logging.info(f"num traces in '{file_path_no_ext}': {len(x_dict)}")
 
-    if args_dict.get('html', True):
-        fig.write_html(f"{file_path_no_ext}.html", full_html=False, include_plotlyjs='cdn')
-    if args_dict.get('png', False):
-        fig.write_image(f"{file_path_no_ext}.png")
-    if args_dict.get('show', True):
-        fig.show()
+    if config.html:
+        with profiling.stage("write_html"):
+            if config.plotlyjs == 'directory':
+                data_root = Path(config.data_root) if config.data_root is not None else plot_dir
+                include_plotlyjs = plotlyjs_src(plot_dir, data_root)
+            elif config.plotlyjs == 'inline':
+                include_plotlyjs = True
+            else:
+                include_plotlyjs = 'cdn'
+            fig.write_html(f"{file_path_no_ext}.html", full_html=False, include_plotlyjs=include_plotlyjs)
+    if config.image_formats:
+        if config.image_batch is not None:
+            config.image_batch.add(fig, file_path_no_ext, config.image_formats)
+        else:
+            image_batch = ImageBatch()
+            image_batch.add(fig, file_path_no_ext, config.image_formats)
+            image_batch.flush()
+    if config.show:
+        with profiling.stage("show"):
+            fig.show()
+
+
+def _plot_traces(directories, x_id, y_id, config):
+    """
+    yields (trace_id, x, y) of each trace of a plot, the folders are loaded one at a time and each is let go once its
+    traces are yielded, one folder is loaded ahead to know whether the plot has a single folder
+
+    x values from file name time stamps are relative to the plot's first file
+    """
+    from plotme.load_data import Folder
+
+    state = PlotState()
+    previous = None
+    n_folder_datas = 0
+    for directory in directories:
+        with profiling.stage("load"):
+            folder_data = Folder(directory, x_id, y_id, config, state)
+        if folder_data.empty:
+            continue
+        n_folder_datas += 1
+        if previous is not None:
+            yield from _folder_traces(previous, False, config)
+        previous = folder_data
+    logging.debug(f"n_folder_datas: {n_folder_datas}")
+    if previous is not None:
+        yield from _folder_traces(previous, n_folder_datas == 1, config)
+
+
+def _folder_traces(folder_data, only_folder, config):
+    """
+    yields (trace_id, x, y) of each trace of a folder
+
+    Parameters
+    ----------
+    folder_data: Folder
+        loaded folder
+    only_folder: bool
+        the folder is the only one of the plot with data, a single trace is then labelled with its y_id
+    config: PlotConfig
+        plot settings
+    """
+    x = folder_data.x
+    y = folder_data.y
+    file_infos = folder_data.file_infos
+
+    # assume all df_type in a folder are the same
+    df_type = file_infos[0]['df_type']
+
+    trace_x_id = list(x[0].keys())[0]
+    for i, traces in enumerate(y):
+        # this section of the code finds a unique trace_id for each trace
+        # the y data contains trace_y_id and for some cases the trace_id
+        num_traces = len(traces)
+
+        #overwrite df_type because it is actually a plot
+        if num_traces == 1 and only_folder and len(y) == 1:
+            df_type = 'plot'
+
+        for trace in traces:
+            trace_y_id = list(trace.keys())[0]
+            match df_type:
+                case 'plot':
+                    trace_id = trace_y_id
+                case 'trace':
+                    if config.trace_label == 'file_name':
+                        trace_id = file_infos[i]['file_stem']
+                    elif config.trace_label == 'folder_name':
+                        trace_id = folder_data.name
+                    else:
+                        raise ValueError (f"Unexpected trace_label: {config.trace_label}, options are file_name or folder_name")
+                case 'point':
+                    trace_id = folder_data.name
+                case _:
+                    logging.error(f"Unexpected df_type: {df_type}")
+
+            trace_id = trace_id.replace(config.remove_from_trace_label, "")
+            yield trace_id, x[i][trace_x_id], trace[trace_y_id]
+
+
+def _decimate_trace(name, trace_x, trace_y, decimate_info):
+    from plotme.decimate import decimate
+
+    n_points = decimate_info.get('n_points', default_decimate_points)
+    n_raw = len(trace_y)
+    trace_x, trace_y = decimate(trace_x, trace_y, n_points, decimate_info.get('method', 'lttb'))
+    if len(trace_y) < n_raw:
+        logging.info(f"decimated '{name}' from {n_raw} to {len(trace_y)} points")
+    return trace_x, trace_y
+
+
+def _nbytes(values):
+    return getattr(values, 'nbytes', 0)
+
+
+def _as_float32(values):
+    # plotly stores numpy arrays in the html as base64 typed arrays, float32 halves the size of float64
+    if getattr(values, 'dtype', None) == 'float64':
+        return values.astype('float32')
+    return values
+
+
+def plotlyjs_src(plot_dir, data_root):
+    """
+    relative path from plot_dir to the plotly.js bundle shared by all plots under data_root, the bundle is written
+    if it is missing or isn't the one of the installed plotly version
+
+    Parameters
+    ----------
+    plot_dir: str or Path
+        directory of the html file
+    data_root: str or Path
+        directory the bundle is written to
+
+    Returns
+    -------
+    str
+        script src to pass as include_plotlyjs
+    """
+    import plotly
+    from plotly.offline import get_plotlyjs
+
+    bundle_path = Path(data_root, plotlyjs_file_name)
+    marker_path = Path(data_root, plotlyjs_marker_name)
+    key = str(bundle_path.absolute())
+    if key not in _plotlyjs_checked:
+        bundle = get_plotlyjs().encode()
+        marker = f"{plotly.__version__} {hashlib.md5(bundle).hexdigest()}"
+        try:
+            # bundles of different plotly versions can have the same size, the marker records which one was written
+            up_to_date = marker_path.read_text() == marker and bundle_path.stat().st_size == len(bundle)
+        except FileNotFoundError:
+            up_to_date = False
+        if not up_to_date:
+            # write to temporary files first so parallel jobs never read a half written bundle, the marker is
+            # written last so an interrupted write is redone
+            for path, content in [(bundle_path, bundle), (marker_path, marker.encode())]:
+                tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+                tmp_path.write_bytes(content)
+                os.replace(tmp_path, path)
+            logging.info(f"plotly.js written to {bundle_path}")
+        _plotlyjs_checked.add(key)
+    return Path(os.path.relpath(bundle_path, plot_dir)).as_posix()
+
+
+def build_figure(traces, x_title='', y_title=''):
+    """
+    create a single panel figure from a list of traces
+
+    Parameters
+    ----------
+    traces: list
+        plotly trace objects or dicts
+    x_title: str
+        x axis title
+    y_title: str
+        y axis title
+
+    Returns
+    -------
+    go.Figure
+    """
+    import plotly.graph_objects as go
+
+    layout = go.Layout(xaxis={'title': {'text': x_title}}, yaxis={'title': {'text': y_title}})
+    return go.Figure(data=traces, layout=layout)
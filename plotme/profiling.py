@@ -0,0 +1,236 @@
+"""
+profiling.py contains the --profile instrumentation, wall time, file counts, bytes read and peak memory per stage and
+per plot_info file
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+report_file_name = "plotme_profile.json"
+run_key = "run"  # stages outside of any plot_info file, e.g. discovery
+
+_active = None
+
+
+class StageRecord(object):
+    """
+    files and bytes a stage read, only counted while profiling
+    """
+
+    def __init__(self, counting=True):
+        self.counting = counting
+        self.files = 0
+        self.bytes = 0
+
+    def add_file(self, file_path=None, n_bytes=None):
+        """
+        count a file, its size is looked up if n_bytes is None
+        """
+        if not self.counting:
+            return
+        self.files += 1
+        if n_bytes is None:
+            try:
+                n_bytes = os.path.getsize(file_path)
+            except OSError:
+                n_bytes = 0
+        self.bytes += n_bytes
+
+
+class Profiler(object):
+    """
+    Totals of every stage per plot_info file.
+
+    Stage names are chosen by the caller, nested stages are named parent/child, e.g. load/read is part of load.
+    Peak memory is the highest memory traced by tracemalloc above what was allocated when the stage started, stages
+    running in parallel threads overlap.
+
+    Parameters
+    ----------
+    trace_memory: bool
+        trace memory allocations with tracemalloc, slows python code down
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.started = time.time()
+        self.plot = run_key
+        # {plot_info file: {stage: {'calls', 'seconds', 'files', 'bytes', 'peak_bytes'}}}
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name):
+        stack = self._local.__dict__.setdefault('stack', [])
+        record = StageRecord()
+        frame = {'peak': 0, 'start': 0}
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # the peak so far belongs to the enclosing stages, reset it to measure this stage on its own
+            for outer in stack:
+                outer['peak'] = max(outer['peak'], peak)
+            tracemalloc.reset_peak()
+            frame = {'peak': current, 'start': current}
+        stack.append(frame)
+        plot = self.plot
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            stack.pop()
+            if self.trace_memory:
+                frame['peak'] = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                for outer in stack:
+                    outer['peak'] = max(outer['peak'], frame['peak'])
+            self._add(plot, name, {'calls': 1, 'seconds': seconds, 'files': record.files, 'bytes': record.bytes,
+                                   'peak_bytes': frame['peak'] - frame['start']})
+
+    def _add(self, plot, name, totals):
+        with self._lock:
+            stage = self.stages.setdefault(plot, {}).setdefault(
+                name, {'calls': 0, 'seconds': 0., 'files': 0, 'bytes': 0, 'peak_bytes': 0})
+            for key, value in totals.items():
+                if key == 'peak_bytes':
+                    stage[key] = max(stage[key], value)
+                else:
+                    stage[key] += value
+
+    def merge(self, stages):
+        """
+        add the stages recorded by another process, e.g. a -j job
+        """
+        for plot, plot_stages in stages.items():
+            for name, totals in plot_stages.items():
+                self._add(plot, name, totals)
+
+    def stage_totals(self):
+        """
+        totals of each stage over all plot_info files
+        """
+        totals = Profiler(trace_memory=False)
+        for plot_stages in self.stages.values():
+            totals.merge({run_key: plot_stages})
+        return totals.stages.get(run_key, {})
+
+    def report(self):
+        report = {'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                  'wall_seconds': time.time() - self.started,
+                  'stages': self.stage_totals(),
+                  'plot_info_files': self.stages}
+        if self.trace_memory and tracemalloc.is_tracing():
+            report['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        rss = peak_rss()
+        if rss is not None:
+            report['peak_rss_bytes'] = rss
+        return report
+
+
+def peak_rss():
+    """
+    highest resident set size of the process so far in bytes, None where the resource module is missing (windows)
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024  # bytes on macOS, KB elsewhere
+
+
+def start(trace_memory=True):
+    """
+    start profiling, stage() records into the returned profiler until stop()
+    """
+    global _active
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _active = Profiler(trace_memory)
+    return _active
+
+
+def stop():
+    """
+    stop profiling and return the report
+    """
+    global _active
+    profiler = _active
+    _active = None
+    if profiler is None:
+        return None
+    report = profiler.report()
+    if profiler.trace_memory:
+        tracemalloc.stop()
+    return report
+
+
+def active():
+    return _active
+
+
+@contextmanager
+def stage(name):
+    """
+    time the enclosed code as stage name if profiling, yields a StageRecord to count the files read
+    """
+    if _active is None:
+        yield StageRecord(counting=False)
+    else:
+        with _active.stage(name) as record:
+            yield record
+
+
+@contextmanager
+def plot_info(file):
+    """
+    record the enclosed stages under plot_info file
+    """
+    if _active is None:
+        yield
+        return
+    previous = _active.plot
+    _active.plot = str(file)
+    try:
+        yield
+    finally:
+        _active.plot = previous
+
+
+def report_path():
+    """
+    report file next to the log file, the current directory if logging to the console only
+    """
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.FileHandler):
+            return Path(Path(handler.baseFilename).parent, report_file_name)
+    return Path(report_file_name)
+
+
+def write_report(report, path=None):
+    """
+    save the report as json and log a summary table
+    """
+    path = Path(path or report_path())
+    with open(path, "w") as json_file:
+        json.dump(report, json_file, indent=4)
+
+    lines = [f"{'stage':<24} {'calls':>6} {'seconds':>9} {'files':>6} {'MB read':>9} {'peak MB':>9}"]
+    for name, totals in sorted(report['stages'].items(), key=lambda item: -item[1]['seconds']):
+        lines.append(f"{name:<24} {totals['calls']:>6} {totals['seconds']:>9.3f} {totals['files']:>6} "
+                     f"{totals['bytes'] / 1024 ** 2:>9.1f} {totals['peak_bytes'] / 1024 ** 2:>9.1f}")
+    plot_seconds = {plot: sum(totals['seconds'] for name, totals in stages.items() if '/' not in name)
+                    for plot, stages in report['plot_info_files'].items() if plot != run_key}
+    for plot, seconds in sorted(plot_seconds.items(), key=lambda item: -item[1])[:5]:
+        lines.append(f"{seconds:9.3f} s {plot}")
+    if 'peak_rss_bytes' in report:
+        lines.append(f"peak RSS {report['peak_rss_bytes'] / 1024 ** 2:.1f} MB")
+    summary = "\n".join(lines)
+    logging.info(f"profile of the {report['wall_seconds']:.1f} s run, nested stages are part of their parent, "
+                 f"slowest plot_info files last, report saved to {path}\n{summary}")
@@ -1,16 +1,100 @@
-
+import os
 from pathlib import Path
 
-import pandas as pd
+
+class ColumnSelector(object):
+    """
+    usecols callable for read(), selects columns by name ignoring leading and trailing white space in the headers
+
+    Parameters
+    ----------
+    columns: iterable
+        names of the columns to read
+    """
+
+    def __init__(self, columns):
+        self.columns = frozenset(columns)
+
+    def __call__(self, column):
+        return str(column).strip() in self.columns
+
+    def __repr__(self):
+        # also used as part of the read cache key
+        return f"ColumnSelector({sorted(self.columns)})"
+
+
+_excel_engine = False  # not looked up yet
+
+
+def is_excel(file_path):
+    return 'xls' in Path(file_path).suffix.lower()
+
+
+def is_csv(file_path):
+    suffix = Path(file_path).suffix.lower()
+    return 'csv' in suffix or 'txt' in suffix
+
+
+def excel_engine():
+    """
+    'calamine' if python-calamine is installed, it parses workbooks several times faster than openpyxl, else None
+    for pandas' default
+    """
+    global _excel_engine
+    if _excel_engine is False:
+        try:
+            import python_calamine  # noqa: F401
+            _excel_engine = 'calamine'
+        except ImportError:
+            _excel_engine = None
+    return _excel_engine
 
 
 def read(file_path, **kwargs):
+    import pandas as pd  # imported on first use so runs that skip every plot don't pay for it
 
     file_extension = Path(file_path).suffix.lower()
 
     if 'csv' in file_extension or 'txt' in file_extension:
         df = pd.read_csv(file_path, **kwargs)
     elif 'xls' in file_extension:
+        if kwargs.get('header') == 'infer':
+            # read_csv's default, read_excel only takes row numbers
+            kwargs['header'] = 0
+        if excel_engine() is not None and 'engine' not in kwargs:
+            kwargs['engine'] = excel_engine()
         df = pd.read_excel(file_path, **kwargs)
 
     return df
+
+
+def project(df, usecols=None, dtype=None):
+    """
+    apply read()'s callable usecols and dtype to an already read DataFrame, columns keep their order in the file
+    """
+    if usecols is not None:
+        df = df[[column for column in df.columns if usecols(column)]]
+    if dtype is not None:
+        df = df.astype(dtype)
+    return df
+
+
+def is_streamed(file_path, chunksize):
+    """
+    True if read_chunks() reads the file in chunks, other files are read in one go
+    """
+    # every row takes at least a byte, files smaller than chunksize bytes are read in one go which is quicker
+    return is_csv(file_path) and os.path.getsize(file_path) >= chunksize
+
+
+def read_chunks(file_path, chunksize=100000, **kwargs):
+    """
+    yield the file as DataFrames of at most chunksize rows, file types that can't be streamed are yielded whole
+    """
+    import pandas as pd
+
+    if is_streamed(file_path, chunksize):
+        with pd.read_csv(file_path, chunksize=chunksize, **kwargs) as reader:
+            yield from reader
+    else:
+        yield read(file_path, **kwargs)
@@ -66,6 +66,17 @@ schema = {
                            "pattern": "^(lines|markers|text)(\\+(lines|markers|text))*(\\+(lines|markers|text))?$"},
             "marker_symbols": {"type": "array", "items": {"type": "integer"}},
             "update_traces_kwargs": {"type": "object"},
+            "webgl_threshold": {"type": "integer", "minimum": 0},
+            "float32": {"type": "boolean"},
+            "low_memory": {"type": "boolean"},
+            "memory_budget": {"type": "number", "exclusiveMinimum": 0},
+            "decimate": {"type": "object", "properties": {
+                "method": {"type": "string", "enum": [
+                    "lttb",
+                    "minmax",
+                ]},
+                "n_points": {"type": "integer", "minimum": 3},
+            }},
         }
 }
 
@@ -108,5 +119,14 @@ template = {
     "pio.template": "plotly_white, see readme for more examples",
     "trace_mode": "'markers'(default), 'lines', 'markers+lines' etc",
     "marker_symbols": ["array of marker symbols numbers, must have one for each trace"],
-    "update_traces_kwargs": "pass through any fig.update_traces key word arguments to plotly"
+    "update_traces_kwargs": "pass through any fig.update_traces key word arguments to plotly",
+    "webgl_threshold": "int, traces with more points are drawn using webgl, default 100000",
+    "float32": "true or false(default), store float trace data as float32 in the html, halves its size",
+    "low_memory": "true or false(default), drop each data file's DataFrame once its x and y values are taken, "
+                  "with float32 they are stored as float32 right away",
+    "memory_budget": "MB, optional, the plot's traces are decimated once their data takes more memory, implies low_memory",
+    "decimate": {
+        "method": "lttb(default) or minmax, shape preserving down sampling of large traces",
+        "n_points": "int, target number of points per trace, default 5000"
+    }
 }
@@ -0,0 +1,127 @@
+"""
+selection.py contains the selection of the folders and data files a plot is made from, shared by the data loading and
+the change detection so a plot only depends on the files it reads
+"""
+import logging
+from pathlib import Path
+
+
+def plot_folders(plot_dir, dir_index):
+    """
+    the folders single_plot loads for a plot_info file in plot_dir
+    """
+    # like glob("**/") plot_dir and its sub directories, leaving out hidden ones
+    folders = dir_index.folders(plot_dir)
+    folders.append(plot_dir)  # include the data_root directory
+    return folders
+
+
+def select_folders(folders, config, log=logging.info):
+    """
+    the folders the plot's folder filters allow, folders named 'ignore' are left out
+    """
+    selected = []
+    for folder in folders:
+        directory = Path(folder)
+        if directory.name == 'ignore':
+            log(f"ignoring {directory} because named 'ignore'")
+            continue
+        if config.folder_include_filter and not check_filter_match(config.folder_include_filter, directory.name):
+            log(f"ignoring {directory} because it does not match folder_include_filter")
+            continue
+        if config.folder_exclude_filter and check_filter_match(config.folder_exclude_filter, directory.name):
+            log(f"ignoring {directory} because it does match folder_exclude_filter")
+            continue
+        selected.append(directory)
+    return selected
+
+
+def select_data_files(directory, config, dir_index=None, log=logging.info):
+    """
+    the data files in directory with one of the plot's file extensions that the file filters allow, in load order
+    """
+    data_files = []
+    for file_extension in config.file_extension:
+        # TODO rename file_extension or split into 2 variables
+        match_string = str(Path(f"*{file_extension}"))
+        if dir_index is not None:
+            ext_data = dir_index.files(directory, match_string)
+        else:
+            ext_data = list(Path(directory).glob(match_string))
+        data_files.extend(ext_data)
+        logging.debug(f"{directory}'s match_string: {match_string}")
+    logging.debug(f"{directory}'s data_files: {data_files}")
+
+    files = []
+    for file in data_files:
+        file_name = Path(file).name
+        if config.file_include_filter and not check_filter_match(config.file_include_filter, file_name):
+            log(f"ignoring {file} because it does not match file_include_filter")
+            continue
+        if config.file_exclude_filter and check_filter_match(config.file_exclude_filter, file_name):
+            log(f"ignoring {file} because it matches file_exclude_filter")
+            continue
+        files.append(file)
+    return files
+
+
+def plot_dependencies(config, dir_index):
+    """
+    the data files the plot is made from and its plot_info file, without duplicates
+
+    Parameters
+    ----------
+    config: PlotConfig
+        plot settings
+    dir_index: DirIndex
+        index containing the plot's directory
+
+    Returns
+    -------
+    list
+        Path of each file
+    """
+    dependencies = {}
+    for directory in select_folders(plot_folders(config.plot_dir, dir_index), config, log=logging.debug):
+        for file in select_data_files(directory, config, dir_index, log=logging.debug):
+            dependencies[Path(file)] = None
+    if config.plot_info_file is not None:
+        dependencies[Path(config.plot_info_file)] = None
+    return list(dependencies)
+
+
+def check_filter_match(filter_value, filename):
+    """
+    Check if filename matches any filter criteria.
+    
+    Parameters:
+    -----------
+    filter_value : str or iterable
+        Filter criteria - can be a single string or an iterable of strings
+    filename : str
+        The filename to check against the filter
+        
+    Returns:
+    --------
+    bool : True if any filter matches, False otherwise
+    """
+    if filter_value is None:
+        return False
+    
+    # Convert string to list for uniform processing
+    if isinstance(filter_value, str):
+        filters = [filter_value]
+    else:
+        # Handle any iterable (list, tuple, set, etc.)
+        try:
+            filters = list(filter_value)
+        except TypeError:
+            # If it's not iterable, treat as single string
+            filters = [str(filter_value)]
+    
+    # Check if any filter matches the filename
+    for filter_item in filters:
+        if filter_item in filename:
+            return True
+    
+    return False
@@ -0,0 +1,254 @@
+"""
+watch.py contains the watch mode, plotme stays running and regenerates the plots affected by changed files
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+
+from plotme.index import DirIndex
+from plotme.plotting import hash_ignore, plot_all, plot_files, plot_info_id, template_file_name
+
+default_debounce = 2.0  # seconds
+default_poll_interval = 5.0  # seconds
+
+# inotify event masks, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+watch_mask = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF)
+event_header = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class InotifyWatcher(object):
+    """
+    Reports changed paths under root using linux's inotify, every directory is watched and directories created
+    later are added as they appear.
+
+    Parameters
+    ----------
+    root: str or Path
+        directory to watch recursively
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watched = {}  # {watch descriptor: directory}
+        for folder in DirIndex(root).folders(root, include_hidden=True):
+            self._add_watch(folder)
+
+    def _add_watch(self, directory):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), watch_mask)
+        if wd < 0:
+            logging.warning(f"unable to watch {directory}: {os.strerror(ctypes.get_errno())}")
+        else:
+            self.watched[wd] = directory
+
+    def read(self, timeout=None):
+        """
+        wait up to timeout seconds (forever if None) for changes
+
+        Returns
+        -------
+        set
+            changed paths, empty if nothing changed within timeout
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        buffer = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, cookie, length = event_header.unpack_from(buffer, offset)
+            name = buffer[offset + event_header.size:offset + event_header.size + length].rstrip(b"\0")
+            offset += event_header.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                logging.warning("too many changes at once, treating everything as changed")
+                changed.add(str(self.root))
+                continue
+            if mask & IN_IGNORED:
+                self.watched.pop(wd, None)
+                continue
+            directory = self.watched.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+            changed.add(path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # watch the new directory and report what was already in it before the watch was added
+                new_index = DirIndex(path)
+                for folder, files in new_index.walk():
+                    self._add_watch(folder)
+                    changed.update(os.path.join(folder, file_name) for file_name in files)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher(object):
+    """
+    Reports changed paths under root by comparing the size and mtime of every file every interval seconds, used where
+    inotify isn't available or doesn't see changes, e.g. network shares
+
+    Parameters
+    ----------
+    root: str or Path
+        directory to watch recursively
+    interval: float
+        seconds between scans
+    """
+
+    def __init__(self, root, interval=default_poll_interval):
+        self.root = Path(root)
+        self.interval = interval
+        self.snapshot = self._snapshot()
+
+    def _snapshot(self):
+        return {os.path.join(folder, name): (stat.st_size, stat.st_mtime_ns)
+                for folder, files in DirIndex(self.root).walk() for name, stat in files.items()}
+
+    def read(self, timeout=None):
+        """
+        wait timeout seconds (interval if None) and report the changes since the previous call
+
+        Returns
+        -------
+        set
+            changed paths, empty if nothing changed
+        """
+        time.sleep(self.interval if timeout is None else timeout)
+        snapshot = self._snapshot()
+        changed = {path for path in snapshot.keys() | self.snapshot.keys()
+                   if snapshot.get(path) != self.snapshot.get(path)}
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(root, poll=False, poll_interval=default_poll_interval):
+    """
+    inotify watcher on linux, polling watcher elsewhere or if poll
+    """
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            logging.warning(f"inotify unavailable ({e}), falling back to polling")
+    return PollingWatcher(root, poll_interval)
+
+
+def wait_for_changes(watcher, debounce=default_debounce):
+    """
+    block until something changes, then keep collecting changes until none arrive for debounce seconds so a burst of
+    writes triggers a single regeneration
+    """
+    changed = set()
+    while not changed:
+        changed = watcher.read()
+    while True:
+        more = watcher.read(debounce)
+        if not more:
+            return changed
+        changed |= more
+
+
+def affected_plot_info_files(changed_paths, plot_info_files):
+    """
+    plot_info files whose folder contains any of the changed paths or is inside a changed directory, changes to
+    plotme's own output are left out
+
+    Parameters
+    ----------
+    changed_paths: iterable
+        changed files and directories
+    plot_info_files: iterable
+        known plot_info files
+
+    Returns
+    -------
+    list
+        affected plot_info files in the order of plot_info_files
+    """
+    changed_paths = [Path(path).absolute() for path in changed_paths
+                     if not any(fnmatch(Path(path).name, pattern) for pattern in hash_ignore)]
+    affected = []
+    for file in plot_info_files:
+        plot_dir = Path(file).parent.absolute()
+        if any(path == plot_dir or plot_dir in path.parents or path in plot_dir.parents for path in changed_paths):
+            affected.append(file)
+    return affected
+
+
+def watch(args_dict={}):
+    """
+    run plot_all and then stay running, regenerating only the plots whose folders change
+
+    Parameters
+    ----------
+    args_dict: dictionary
+        input arguments
+
+    """
+    data_root = Path(args_dict.get('data_root', os.getcwd()))
+    plot_info_pattern = f"*{args_dict.get('plot_info_file', plot_info_id)}.json"
+    debounce = args_dict.get('debounce', default_debounce)
+
+    plot_all(args_dict)
+    # the first run already applied these
+    args_dict = dict(args_dict, force=False, clear_cache=False, template=False)
+
+    watcher = make_watcher(data_root, args_dict.get('poll', False),
+                           args_dict.get('poll_interval', default_poll_interval))
+    logging.info(f"watching {data_root.absolute()} for changes, press ctrl+c to stop")
+    plot_info_files = [file for file in DirIndex(data_root).find_files(plot_info_pattern)
+                       if template_file_name not in str(file)]
+    try:
+        while True:
+            changed = wait_for_changes(watcher, debounce)
+
+            # pick up new and removed plot_info files
+            for path in changed:
+                if fnmatch(Path(path).name, plot_info_pattern) and template_file_name not in path:
+                    plot_info_files = [file for file in plot_info_files if str(file) != path]
+                    if os.path.isfile(path):
+                        plot_info_files.append(Path(path))
+
+            affected = affected_plot_info_files(changed, plot_info_files)
+            if not affected:
+                continue
+            logging.info(f"{len(changed)} changed paths affect {len(affected)} plot_info files")
+            try:
+                plot_files(affected, args_dict)
+            except Exception as e:
+                # keep watching, the next change may fix it
+                logging.error(e, exc_info=True)
+    except KeyboardInterrupt:
+        logging.info("stopped watching")
+    finally:
+        watcher.close()
+    return 0
@@ -0,0 +1,14 @@
+"""
+the tests use a temporary read cache instead of the user's ~/.cache/plotme
+"""
+import os
+import shutil
+import tempfile
+
+# plotme.cache reads PLOTME_CACHE_DIR when it's imported, which is after this conftest is loaded
+cache_dir = tempfile.mkdtemp(prefix="plotme_cache_")
+os.environ['PLOTME_CACHE_DIR'] = cache_dir
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(cache_dir, ignore_errors=True)
@@ -1,11 +1,30 @@
+import glob
 import json
 import os
+import subprocess
+import sys
+import time
+import weakref
+from datetime import datetime
 
+import jsonschema
 import pytest
 import numpy as np
 import pandas as pd
+import plotly.graph_objects as go
+import plotly.io
+import plotly.offline
 
-from plotme.plotting import plot_all
+from plotme import profiling
+from plotme.cache import ReadCache
+from plotme.config import PlotConfig, PlotState, load_plot_info
+from plotme.decimate import decimate
+from plotme.hashing import file_md5, stat_dir_hash, stat_files_hash
+from plotme.index import DirIndex
+from plotme.load_data import Folder, preprocessing
+from plotme.plotting import plot_all, plotlyjs_src, process_plot_info
+from plotme.read import ColumnSelector, is_csv, read
+from plotme.watch import InotifyWatcher, PollingWatcher, affected_plot_info_files
 from plotme.plotting import template_file_name
 
 def init_test():
@@ -61,6 +80,531 @@ def test_housing_data():
 
     assert ret == 0, "should return 0"
 
+def test_read_cache(tmp_path):
+    data_file = tmp_path / "cached.csv"
+    pd.DataFrame(np.random.randn(10, 2), columns=list('AB')).to_csv(data_file)
+    cache = ReadCache(cache_dir=tmp_path / "cache")
+
+    df = cache.read(data_file, index_col=0)
+    assert len(list((tmp_path / "cache").glob("*.pkl"))) == 1, "parsed file should be cached"
+    pd.testing.assert_frame_equal(cache.read(data_file, index_col=0), df)
+
+    # a changed file must be re-parsed
+    pd.DataFrame(np.ones((5, 2)), columns=list('AB')).to_csv(data_file)
+    assert len(cache.read(data_file, index_col=0)) == 5, "stale cache entry used"
+
+    for meta_path in (tmp_path / "cache").glob("*.json"):
+        os.utime(meta_path, (time.time() - 60, time.time() - 60))  # used by an earlier run
+    ReadCache(cache_dir=tmp_path / "cache", max_size=0).prune()
+    assert len(list((tmp_path / "cache").iterdir())) == 0, "prune should evict all entries"
+
+    cache.read(data_file, index_col=0)
+    (tmp_path / "cache" / "notes.txt").write_text("not a cache entry")
+    cache.clear()
+    assert [path.name for path in (tmp_path / "cache").iterdir()] == ["notes.txt"], "clear removed other files"
+
+
+@pytest.mark.parametrize("index_col", [None, 0])
+def test_incremental_read(tmp_path, index_col):
+    data_file = tmp_path / "log.csv"
+    data_file.write_text("time,a,b\n0,1.5,x\n1,2.5,y\n")
+    cache = ReadCache(cache_dir=tmp_path / "cache", incremental=True)
+    kwargs = {"index_col": index_col, "usecols": ColumnSelector(["time", "a"])}
+    cache.read(data_file, **kwargs)
+
+    with open(data_file, "a") as log_file:
+        log_file.write("2,3.5,z\n3,4.5,w\n4,5.")  # the last row is still being written
+    pd.testing.assert_frame_equal(cache.read(data_file, **kwargs), read(data_file, **kwargs).iloc[:-1])
+    with open(data_file, "a") as log_file:
+        log_file.write("5,z\n")
+    pd.testing.assert_frame_equal(cache.read(data_file, **kwargs), read(data_file, **kwargs))
+    meta = json.loads(next((tmp_path / "cache").glob("*.json")).read_text())
+    assert meta["offset"] == data_file.stat().st_size and meta["rows"] == 5, "appended rows not recorded"
+    assert meta["parts"] == 2 and len(list((tmp_path / "cache").glob("*.pkl"))) == 3, \
+        "appended rows should be stored without rewriting the cached rows"
+
+    # entries used by this run are kept even when they don't fit in the cache
+    next_run = ReadCache(cache_dir=tmp_path / "cache", max_size=0, incremental=True)
+    pd.testing.assert_frame_equal(next_run.read(data_file, **kwargs), read(data_file, **kwargs))
+    next_run.prune()
+    assert len(list((tmp_path / "cache").glob("*.pkl"))) == 3, "entry used by this run was evicted"
+
+    # rewritten files are parsed again
+    data_file.write_text("time,a,b\n0,9.5,x\n1,2.5,y\n2,3.5,z\n3,4.5,w\n4,5.5,z\n6,7.5,v\n")
+    pd.testing.assert_frame_equal(cache.read(data_file, **kwargs), read(data_file, **kwargs))
+    data_file.write_text("time,a\n0,1.5\n")
+    pd.testing.assert_frame_equal(cache.read(data_file, **kwargs), read(data_file, **kwargs))
+
+
+def test_excel_sidecar(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    df = pd.DataFrame(np.random.randn(20, 4), columns=["time", "a", "b", "c"])
+    df.to_excel(data_dir / "book.xlsx", index=False)
+    read_cache = ReadCache(cache_dir=tmp_path / "cache")
+
+    folder = Folder(data_dir, "time", ["a"], {"read_cache": read_cache})
+    np.testing.assert_allclose(folder.y[0][0]["a"], df["a"])
+    folder = Folder(data_dir, "time", ["b", "c"], {"read_cache": read_cache})
+    assert folder.dataframes[0].columns.to_list() == ["time", "b", "c"], "sheet not projected to the used columns"
+    np.testing.assert_allclose(folder.y[0][1]["c"], df["c"])
+    assert len(list((tmp_path / "cache").glob("*.json"))) == 1, "each column selection should share one sidecar"
+
+
+def test_stat_dir_hash(tmp_path):
+    (tmp_path / "sub").mkdir()
+    data_file = tmp_path / "sub" / "data.csv"
+    data_file.write_text("a,b\n1,2\n")
+    ignore = ["*.html"]
+
+    dir_hash, manifest = stat_dir_hash(tmp_path, ignore)
+    assert list(manifest) == ["sub/data.csv"], "manifest should list files by relative path"
+    (tmp_path / "plot.html").write_text("output")
+    assert stat_dir_hash(tmp_path, ignore, manifest)[0] == dir_hash, "ignored files changed the hash"
+
+    data_file.write_text("a,b\n1,3\n")
+    assert stat_dir_hash(tmp_path, ignore, manifest)[0] != dir_hash, "content change not detected"
+
+
+def test_appended_hash(tmp_path):
+    data_file = tmp_path / "log.csv"
+    data_file.write_text("a,b\n1,2\n")
+    dir_hash, manifest = stat_files_hash(tmp_path, [data_file], appended=is_csv)
+    size = data_file.stat().st_size
+
+    with open(data_file, "a") as log_file:
+        log_file.write("3,4\n")
+    appended_hash, appended_manifest = stat_files_hash(tmp_path, [data_file], manifest, appended=is_csv)
+    assert appended_hash != dir_hash, "appended rows not detected"
+    assert appended_manifest["log.csv"][3] == file_md5(data_file, start=size, seed=manifest["log.csv"][3]), \
+        "only the appended bytes should be hashed"
+
+
+def test_plot_dependencies(tmp_path):
+    (tmp_path / "run").mkdir()
+    data_file = tmp_path / "run" / "data.csv"
+    pd.DataFrame(np.random.randn(10, 2), columns=list('AB')).to_csv(data_file)
+    plot_info_file = tmp_path / "plot_info.json"
+    plot_info_file.write_text(json.dumps({"schema": {"file_include_filter": "data"}}))
+    args_dict = {"data_root": tmp_path, "show": False, "cache": False}
+    plot_all(args_dict)
+
+    def regenerated():
+        (tmp_path / "plot.html").unlink(missing_ok=True)
+        plot_all(args_dict)
+        return (tmp_path / "plot.html").exists()
+
+    (tmp_path / "run" / "export.csv").write_text("a,b\n1,2\n")  # excluded by file_include_filter
+    (tmp_path / "notes.txt").write_text("not a data file")
+    (tmp_path / "ignore").mkdir()
+    (tmp_path / "ignore" / "data.csv").write_text("a,b\n1,2\n")
+    assert not regenerated(), "files the plot doesn't read triggered regeneration"
+
+    pd.DataFrame(np.ones((5, 2)), columns=list('AB')).to_csv(data_file)
+    assert regenerated(), "changed data file not detected"
+    plot_info_file.write_text(json.dumps({"title_text": "new", "schema": {"file_include_filter": "data"}}))
+    assert regenerated(), "changed plot_info file not detected"
+    (tmp_path / "run" / "data_2.csv").write_text("A,B\n1,2\n")
+    assert regenerated(), "new data file not detected"
+
+
+def test_parallel_jobs(tmp_path):
+    for folder in ["good_1", "good_2", "bad"]:
+        (tmp_path / folder).mkdir()
+        pd.DataFrame(np.random.randn(10, 2), columns=list('AB')).to_csv(tmp_path / folder / "data.csv")
+        plot_info = {"title_text": folder}
+        if folder == "bad":
+            plot_info["trace_mode"] = "not a trace mode"  # fails schema validation
+        with open(tmp_path / folder / "plot_info.json", "w") as json_file:
+            json.dump(plot_info, json_file)
+
+    with pytest.raises(RuntimeError, match="1 of 3"):
+        plot_all({"data_root": tmp_path, "jobs": 2, "show": False, "cache": False})
+
+    for folder in ["good_1", "good_2"]:
+        assert (tmp_path / folder / "plot.html").exists(), "a failing job should not stop the others"
+        assert (tmp_path / folder / "plot_info_previous_hash").exists(), "hash not saved"
+    assert not (tmp_path / "bad" / "plot_info_previous_hash").exists(), "hash saved for failed plot"
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_profile(tmp_path, jobs):
+    for folder in ["a", "b"]:
+        (tmp_path / folder / "run").mkdir(parents=True)
+        for i in range(3):
+            pd.DataFrame(np.random.randn(10, 2), columns=list('AB')).to_csv(tmp_path / folder / "run" / f"{i}.csv")
+        (tmp_path / folder / "plot_info.json").write_text("{}")
+
+    profiling.start()
+    plot_all({"data_root": tmp_path, "jobs": jobs, "show": False, "cache": False})
+    report = profiling.stop()
+
+    plot_stages = report["plot_info_files"][str(tmp_path / "a" / "plot_info.json")]
+    assert plot_stages["load/read"]["files"] == 3, "files read not counted"
+    assert plot_stages["load/read"]["bytes"] > 0, "bytes read not counted"
+    assert report["stages"]["write_html"]["calls"] == 2, "stages of both plot_info files should be totalled"
+    assert report["plot_info_files"]["run"]["discovery"]["calls"] == 1, "discovery not recorded"
+
+    profiling.write_report(report, tmp_path / profiling.report_file_name)
+    with open(tmp_path / profiling.report_file_name) as json_file:
+        assert json.load(json_file)["stages"].keys() == report["stages"].keys(), "report not saved"
+
+
+def test_folder_memo(tmp_path):
+    (tmp_path / "sub").mkdir()
+    pd.DataFrame(np.random.randn(10, 3), columns=["x", "A", "B"]).to_csv(tmp_path / "sub" / "data.csv", index=False)
+    (tmp_path / "plot_info.json").write_text(json.dumps({"x_id": "x", "y_id": ["A", "B"], "y_title": "y"}))
+    (tmp_path / "sub" / "plot_info.json").write_text(json.dumps({"x_id": "x", "y_id": "A"}))
+
+    profiling.start(trace_memory=False)
+    plot_all({"data_root": tmp_path, "show": False, "cache": False})
+    report = profiling.stop()
+
+    assert report["stages"]["load/read"]["files"] == 1, "overlapping plot_info files should share the loaded data"
+    assert (tmp_path / "plot.html").exists() and (tmp_path / "sub" / "plot.html").exists(), "plot missing"
+
+
+def test_plot_config(tmp_path):
+    plot_info_file = tmp_path / "plot_info.json"
+    plot_info_file.write_text(json.dumps({"y_id": " B ", "schema": {"file_extension": "csv"}}))
+
+    plot_info = load_plot_info(plot_info_file)
+    plot_info["schema"]["file_extension"] = "txt"
+    assert load_plot_info(plot_info_file)["schema"]["file_extension"] == "csv", "cached plot_info changed"
+
+    config = PlotConfig(load_plot_info(plot_info_file))
+    assert (config.y_id, config.y_title, config.x_id) == ("B", "B", "index"), "wrong ids or defaults"
+    assert config.file_extension == ["csv"], "file_extension should be a list"
+    with pytest.raises(AttributeError):
+        config.y_id = "A"
+
+    plot_info_file.write_text(json.dumps({"trace_mode": "not a trace mode"}))
+    with pytest.raises(jsonschema.ValidationError):
+        load_plot_info(plot_info_file)
+
+    # settings that break building the config are reported as schema errors
+    for plot_info in [{"schema": "oops"}, {"schema": {"file_extension": 5}}]:
+        plot_info_file.write_text(json.dumps(plot_info))
+        with pytest.raises(jsonschema.ValidationError):
+            process_plot_info(plot_info_file, {"show": False, "cache": False})
+
+
+def test_folder_min_timestamp(tmp_path):
+    for folder, stamp in [("a", "20240101_000000"), ("b", "20240101_000100")]:
+        (tmp_path / folder).mkdir()
+        pd.DataFrame({"y": [1., 2.]}).to_csv(tmp_path / folder / f"run_{stamp}.csv", index=False)
+    args_dict = {"schema": {"x_id_in_file_name": True, "x_time_format": "%Y%m%d_%H%M%S"}, "post": "avg"}
+
+    state = PlotState()
+    x_a = Folder(tmp_path / "a", "run_", "y", args_dict, state).x[0]["run_"]
+    x_b = Folder(tmp_path / "b", "run_", "y", args_dict, state).x[0]["run_"]
+
+    assert list(x_a) == [0] and list(x_b) == [60], "x should be relative to the plot's first file"
+    assert "min_timestamp" not in args_dict, "args_dict changed"
+
+
+@pytest.mark.parametrize("float32", [False, True])
+def test_folder_low_memory(tmp_path, float32):
+    df = pd.DataFrame(np.random.randn(20, 4), columns=list('xABC'))
+    df.to_csv(tmp_path / "data.csv", index=False)
+
+    folder = Folder(tmp_path, "x", ["A", "B"], {"low_memory": True, "float32": float32, "pre": ["remove_null"]})
+
+    assert folder.dataframes == [None], "DataFrames should be dropped"
+    y = folder.y[0][1]["B"]
+    assert y.base is None and y.flags.c_contiguous, "trace data should own a contiguous buffer"
+    assert y.dtype == (np.float32 if float32 else np.float64), "float32 not applied"
+    np.testing.assert_allclose(y, df["B"], rtol=1e-6)
+    np.testing.assert_allclose(folder.x[0]["x"], df["x"], rtol=1e-6)
+
+
+def test_folder_load_workers(tmp_path):
+    for i in range(8):
+        pd.DataFrame({"x": np.arange(5), "y": np.full(5, i)}).to_csv(tmp_path / f"data_{i}.csv", index=False)
+
+    serial = Folder(tmp_path, "x", "y", {})
+    threaded = Folder(tmp_path, "x", "y", {"load_workers": 4})
+
+    assert threaded.file_infos == serial.file_infos, "file order changed by parallel loading"
+    for serial_df, threaded_df in zip(serial.dataframes, threaded.dataframes):
+        pd.testing.assert_frame_equal(threaded_df, serial_df)
+
+
+def test_folder_column_projection(tmp_path):
+    df = pd.DataFrame(np.random.randn(20, 50), columns=[f" col_{i} " for i in range(50)])
+    df.to_csv(tmp_path / "wide.csv", index=False)
+
+    folder = Folder(tmp_path, "col_0", ["col_1", "col_2"], {"pre": ["convert_to_float"]})
+
+    assert folder.dataframes[0].columns.to_list() == ["col_0", "col_1", "col_2"], "unused columns read"
+    assert isinstance(folder.y[0][0]["col_1"], np.ndarray), "trace data should be numpy arrays"
+    np.testing.assert_allclose(folder.x[0]["col_0"], df[" col_0 "])
+    np.testing.assert_allclose(folder.y[0][1]["col_2"], df[" col_2 "])
+
+    # rows removed because of a null in an unplotted column must still be removed
+    df.iloc[0, 10] = np.nan
+    df.to_csv(tmp_path / "wide.csv", index=False)
+    folder = Folder(tmp_path, "col_0", ["col_1", "col_2"], {"pre": ["remove_null"]})
+    assert len(folder.y[0][0]["col_1"]) == 19, "remove_null ignored unplotted columns"
+
+
+@pytest.mark.parametrize("post", ["avg", "max", "min"])
+def test_streamed_post(tmp_path, post):
+    dfs = {}
+    for force in [10, 20, 30]:
+        dfs[force] = pd.DataFrame({"y": np.random.randn(95), "z": np.random.randn(95)})
+        dfs[force].to_csv(tmp_path / f"test_{force}N.csv", index=False)
+    dfs[20].loc[13, "y"] = np.nan  # an empty cell in the second chunk
+    dfs[20].to_csv(tmp_path / "test_20N.csv", index=False)
+    args_dict = {"schema": {"x_id_is_reg_exp": True}, "post": post, "chunksize": 10}
+
+    folder = Folder(tmp_path, "_(\\d+)N", "y", args_dict)
+
+    points = dict(zip(folder.x[0]["_(\\d+)N"], folder.y[0][0]["y"]))
+    for force, df in dfs.items():
+        expected = {"avg": np.average, "max": np.max, "min": np.min}[post](df["y"])
+        assert points[force] == pytest.approx(expected, nan_ok=True), f"wrong {post} for {force}N"
+
+
+@pytest.mark.parametrize("post", ["avg", "max", "min"])
+@pytest.mark.parametrize("n_rows", [[20, 20, 20], [5, 20, 11]])
+def test_batched_post(tmp_path, post, n_rows):
+    dfs = {}
+    for force, rows in zip([10, 20, 30], n_rows):
+        dfs[force] = pd.DataFrame({"y": np.random.randn(rows), "z": np.random.randn(rows)})
+        dfs[force].to_csv(tmp_path / f"test_{force}N.csv", index=False)
+    dfs[20].loc[3, "y"] = np.nan
+    dfs[20].to_csv(tmp_path / "test_20N.csv", index=False)
+    args_dict = {"schema": {"x_id_is_reg_exp": True}, "post": post}
+
+    # all columns are held in memory when y_id is headers
+    folder = Folder(tmp_path, "_(\\d+)N", "headers", args_dict)
+
+    x = folder.x[0]["_(\\d+)N"]
+    y = folder.y[0][0]["z"].reshape(len(x), 2)
+    for (force, y_value), z_value in zip(zip(x, y[:, 0]), y[:, 1]):
+        function = {"avg": np.average, "max": np.max, "min": np.min}[post]
+        np.testing.assert_allclose([y_value, z_value], [function(dfs[force]["y"]), function(dfs[force]["z"])],
+                                   err_msg=f"wrong {post} for {force}N")
+
+    # files smaller than chunksize bytes are parsed together, larger ones are streamed
+    for chunksize in [500, 100000]:
+        folder = Folder(tmp_path, "_(\\d+)N", "y", dict(args_dict, chunksize=chunksize))
+        points = dict(zip(folder.x[0]["_(\\d+)N"], folder.y[0][0]["y"]))
+        for force, df in dfs.items():
+            expected = {"avg": np.average, "max": np.max, "min": np.min}[post](df["y"])
+            assert points[force] == pytest.approx(expected, nan_ok=True), f"wrong {post} for {force}N"
+
+
+@pytest.mark.parametrize("pre, c_values, expected", [(["remove_zero"], [["x", "1"], ["0", "1"]], {10: 2.0, 20: 7.0}),
+                                                     (["remove_strings"], [["x", ""], ["1", ""]], {10: 3.0, 20: 6.0})])
+def test_batched_post_row_filters(tmp_path, pre, c_values, expected):
+    # column c holds text in one file and numbers in the other, it decides which rows are kept
+    for force, y_values, c in zip([10, 20], [[1, 3], [5, 7]], c_values):
+        rows = "".join(f"{y},{value}\n" for y, value in zip(y_values, c))
+        (tmp_path / f"t_{force}N.csv").write_text(f"y,c\n{rows}")
+    args_dict = {"schema": {"x_id_is_reg_exp": True}, "post": "avg", "pre": pre}
+
+    folder = Folder(tmp_path, "_(\\d+)N", "y", args_dict)
+
+    points = dict(zip(folder.x[0]["_(\\d+)N"], folder.y[0][0]["y"]))
+    assert points == expected, "rows filtered differently than when each file is loaded on its own"
+
+
+def test_point_time_stamps(tmp_path):
+    stamps = ["20240101_000100", "20240101_000000", "20240101_001000"]
+    for stamp in stamps:
+        pd.DataFrame({"y": [1., 2.]}).to_csv(tmp_path / f"run_{stamp}.csv", index=False)
+    args_dict = {"schema": {"x_id_in_file_name": True, "x_time_format": "%Y%m%d_%H%M%S"}, "post": "avg"}
+
+    folder = Folder(tmp_path, "run_", "y", args_dict)
+
+    first = folder.file_infos[0]["file_stem"][len("run_"):]
+    expected = [(datetime.strptime(info["file_stem"][len("run_"):], "%Y%m%d_%H%M%S")
+                 - datetime.strptime(first, "%Y%m%d_%H%M%S")).total_seconds() for info in folder.file_infos]
+    np.testing.assert_allclose(folder.x[0]["run_"], expected, err_msg="x should be relative to the first file")
+
+
+def test_preprocessing():
+    df = pd.DataFrame({"a": [1.0, 0, np.nan, 4, 5, 6],
+                       "b": ["x", 1, 2, None, 3.5, "0"],
+                       "c": [1, 2, 3, 4, 5, 0]})
+
+    df_out = preprocessing(df, ["remove_null", "remove_strings", "convert_to_float", "remove_zero"])
+    assert df_out.index.to_list() == [4], "wrong rows removed"
+    assert df_out.dtypes.to_list() == [float, float, float], "not converted to float"
+
+    # remove_zero before converting compares the original values, the string "0" isn't zero
+    df_out = preprocessing(df[["b"]], ["remove_zero", "remove_null"])
+    assert df_out.index.to_list() == [0, 1, 2, 4, 5], "wrong rows removed"
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_decimate(method):
+    x = np.arange(100000)
+    y = np.sin(x / 1000) + np.random.randn(100000) * 0.01
+    y[12345] = 10  # a spike must survive decimation
+
+    x_out, y_out = decimate(x, y, 1000, method)
+
+    assert len(y_out) <= 1002, "too many points"
+    assert x_out[0] == 0 and x_out[-1] == 99999, "first and last point should be kept"
+    assert 12345 in x_out, "spike removed"
+    assert np.all(np.diff(x_out) > 0), "points should stay in order"
+
+
+def test_webgl_and_decimate_plot_info(tmp_path):
+    pd.DataFrame({"x": np.arange(20000), "y": np.random.randn(20000)}).to_csv(tmp_path / "data.csv", index=False)
+    plot_info = {"x_id": "x", "y_id": "y", "webgl_threshold": 1000, "decimate": {"n_points": 2000}}
+    with open(tmp_path / "plot_info.json", "w") as json_file:
+        json.dump(plot_info, json_file)
+
+    plot_all({"data_root": tmp_path, "show": False, "cache": False})
+
+    html = (tmp_path / "plot.html").read_text()
+    assert '"type":"scattergl"' in html, "large trace should use webgl"
+
+
+def test_streamed_folders(tmp_path, monkeypatch):
+    for folder in ["a", "b", "c", "d"]:
+        (tmp_path / folder).mkdir()
+        pd.DataFrame({"x": np.arange(20000), "y": np.random.randn(20000)}).to_csv(tmp_path / folder / f"{folder}.csv",
+                                                                                 index=False)
+    (tmp_path / "plot_info.json").write_text(json.dumps({"x_id": "x", "y_id": "y", "memory_budget": 0.5}))
+
+    alive = weakref.WeakSet()
+    most_alive = []
+
+    class CountedFolder(Folder):
+        def __init__(self, *args, **kwargs):
+            most_alive.append(len(alive))
+            alive.add(self)
+            super().__init__(*args, **kwargs)
+
+    figures = []
+    monkeypatch.setattr("plotme.load_data.Folder", CountedFolder)
+    monkeypatch.setattr("plotme.plotting.build_figure", lambda traces, *args: figures.append(traces) or go.Figure())
+    plot_all({"data_root": tmp_path, "show": False, "html": False, "cache": False})
+
+    assert max(most_alive) <= 1, "folders should be let go once their traces are taken"
+    traces = figures[0]
+    assert sorted(trace["name"] for trace in traces) == ["a", "b", "c", "d"], "a folder's trace is missing"
+    assert all(len(trace["y"]) == 5000 for trace in traces), "traces over the memory budget should be decimated"
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_image_batch(tmp_path, monkeypatch, jobs):
+    # kaleido isn't needed to check the images of a run are rendered by one write_images call
+    calls = []
+    monkeypatch.setattr(plotly.io, "write_images", lambda figs, files, format: calls.append((files, format)))
+    for folder in ["a", "b", "c"]:
+        (tmp_path / folder).mkdir()
+        pd.DataFrame(np.random.randn(10, 2), columns=list('AB')).to_csv(tmp_path / folder / "data.csv")
+        (tmp_path / folder / "plot_info.json").write_text("{}")
+
+    plot_all({"data_root": tmp_path, "show": False, "cache": False, "jobs": jobs, "png": True,
+              "image_format": ["svg"]})
+
+    assert len(calls) == 1, "images should be exported in one batch"
+    files, formats = calls[0]
+    assert sorted(files) == sorted(str(tmp_path / folder / f"plot.{image_format}")
+                                   for folder in ["a", "b", "c"] for image_format in ["svg", "png"])
+    assert formats == [file.rsplit(".", 1)[1] for file in files], "format doesn't match the file"
+
+
+def test_plotlyjs_directory(tmp_path):
+    (tmp_path / "a").mkdir()
+    pd.DataFrame({"x": np.arange(10), "y": np.random.randn(10)}).to_csv(tmp_path / "a" / "data.csv", index=False)
+    with open(tmp_path / "a" / "plot_info.json", "w") as json_file:
+        json.dump({"x_id": "x", "y_id": "y", "float32": True}, json_file)
+    args_dict = {"data_root": tmp_path, "show": False, "cache": False, "plotlyjs": "directory"}
+
+    plot_all(args_dict)
+
+    html_path = tmp_path / "a" / "plot.html"
+    html = html_path.read_text()
+    assert (tmp_path / "plotly.min.js").exists(), "plotly.js not written to the data_root"
+    assert 'src="../plotly.min.js"' in html, "html should load the shared plotly.js"
+    assert '"dtype":"f4"' in html, "trace data should be float32"
+
+    html_mtime = html_path.stat().st_mtime_ns
+    plot_all(args_dict)
+    assert html_path.stat().st_mtime_ns == html_mtime, "writing plotly.js triggered a regeneration"
+
+
+def test_plotlyjs_upgrade(tmp_path):
+    bundle = plotly.offline.get_plotlyjs().encode()
+    # the bundle of another plotly version that happens to have the same size
+    (tmp_path / "plotly.min.js").write_bytes(b" " * len(bundle))
+    (tmp_path / "plotly.min.js.version").write_text("0.0.0")
+
+    assert plotlyjs_src(tmp_path / "a", tmp_path) == "../plotly.min.js"
+    assert (tmp_path / "plotly.min.js").read_bytes() == bundle, "plotly.js of another version kept"
+
+
+def test_dir_index(tmp_path):
+    for folder in ["a/b", ".hidden/c", "d"]:
+        (tmp_path / folder).mkdir(parents=True)
+    for file in ["a/b/data.csv", "a/b/data.xlsx", ".hidden/c/my_plot_info.json", "plot_info.json"]:
+        (tmp_path / file).write_text("")
+
+    dir_index = DirIndex(tmp_path)
+
+    globbed = sorted(os.path.normpath(folder) for folder in glob.glob(f"{tmp_path}/**/", recursive=True))
+    assert sorted(dir_index.folders(tmp_path)) == globbed, "folders should match glob"
+    assert sorted(dir_index.find_files("*plot_info.json")) == sorted(tmp_path.glob("**/*plot_info.json"))
+    assert dir_index.files(tmp_path / "a" / "b", "*csv") == [tmp_path / "a" / "b" / "data.csv"]
+    assert dir_index.stat(tmp_path / "a" / "b" / "data.csv").st_size == 0
+
+
+def test_affected_plot_info_files(tmp_path):
+    root_plot_info = tmp_path / "plot_info.json"
+    sub_plot_info = tmp_path / "sub" / "plot_info.json"
+    other_plot_info = tmp_path / "other" / "plot_info.json"
+    plot_info_files = [root_plot_info, sub_plot_info, other_plot_info]
+
+    affected = affected_plot_info_files([tmp_path / "sub" / "deeper" / "data.csv"], plot_info_files)
+    assert affected == [root_plot_info, sub_plot_info], "only the folders containing the change are affected"
+    assert affected_plot_info_files([tmp_path / "sub" / "plot.html"], plot_info_files) == [], "output file changed"
+
+
+@pytest.mark.parametrize("watcher_class", [
+    PollingWatcher,
+    pytest.param(InotifyWatcher, marks=pytest.mark.skipif(not sys.platform.startswith("linux"), reason="linux only")),
+])
+def test_watcher(tmp_path, watcher_class):
+    (tmp_path / "sub").mkdir()
+    watcher = watcher_class(tmp_path)
+    data_file = tmp_path / "sub" / "data.csv"
+    data_file.write_text("a,b\n1,2\n")
+
+    changed = watcher.read(0.5)
+    watcher.close()
+
+    assert str(data_file) in changed, "new file not reported"
+
+
+def test_lazy_imports(tmp_path):
+    heavy_modules = ["plotly", "pandas", "numpy", "jsonschema"]
+    pd.DataFrame(np.random.randn(10, 2), columns=list('AB')).to_csv(tmp_path / "data.csv")
+    (tmp_path / "plot_info.json").write_text("{}")
+    plot_all({"data_root": tmp_path, "show": False, "cache": False})
+
+    # every plot is unchanged so the second run should only need the standard library
+    script = ("import sys; from plotme.__main__ import plot_all; "
+              f"plot_all({{'data_root': {str(tmp_path)!r}, 'show': False, 'cache': False}}); "
+              f"print(','.join(m for m in {heavy_modules!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "", f"skipped run imported {result.stdout.strip()}"
+
+    # plotme -v only needs the command line parser
+    script = ("import sys; import plotme.__main__; "
+              f"print(','.join(m for m in {heavy_modules!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "", f"importing the command line imported {result.stdout.strip()}"
+    subprocess.run([sys.executable, "-m", "plotme", "-v"], capture_output=True, check=True)
+
+
 def test_local_data():
 
     os.chdir(r"D:\localData")